@@ -0,0 +1,69 @@
+"""Benchmark alignment of gaze data to areas of interest.
+
+Compares the original per-screen implementation of `align_to_aoi` (copying
+and flooring gaze data, then indexing each screen with boolean masks)
+against the blockwise single-gather implementation, for simulated epochs
+of binocular data mapped to four screens.
+
+Usage: python benchmarks/bench_align.py [n_trials]
+"""
+import sys, time, tracemalloc
+import numpy as np
+from nivlink import Screen, align_to_aoi
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~#
+### Define benchmark.
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~#
+
+## Define metadata.
+n_trials = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+n_eyes, n_times, n_screens = 2, 1500, 4
+xdim, ydim = 1600, 1200
+rng = np.random.RandomState(47404)
+
+## Define screens.
+screen = Screen(xdim, ydim, n_screens)
+for k in range(n_screens):
+    for i in range(3):
+        screen.add_rectangle_aoi(i * 500 + 50, i * 500 + 450, 100 * k, 100 * k + 600, screen_id=k+1)
+
+## Simulate gaze data (partly off screen) and mapping.
+data = rng.uniform(-100, 1700, (n_trials, n_eyes, 2, n_times))
+data[rng.uniform(size=data.shape) < 0.01] = np.nan
+mapping = rng.randint(0, n_screens, n_trials)
+
+def legacy(data, screen, mapping):
+    data = np.array(data.copy()).swapaxes(2,3)
+    n_trials, n_eyes, n_times, n_dim = data.shape
+    with np.errstate(invalid='ignore'):
+        data = np.floor(data).astype(int)
+    missing_x = np.logical_or(data[...,0] < 0, data[...,0] >= screen.xdim )
+    missing_y = np.logical_or(data[...,1] < 0, data[...,1] >= screen.ydim )
+    missing = np.logical_or(missing_x, missing_y)
+    data[missing] = 0
+    aligned = np.zeros_like(missing, dtype=int)
+    for ix in np.unique(mapping):
+        current_screen = screen.indices[...,ix]
+        row = data[mapping == ix, :, :, 0].flatten()
+        col = data[mapping == ix, :, :, 1].flatten()
+        t = np.sum(mapping == ix)
+        aligned[mapping == ix] = current_screen[row, col].reshape(t, n_eyes, n_times)
+    aligned[missing] = 0
+    return aligned
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~#
+### Main loop.
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~#
+
+print('%d trials x %d eyes x %d samples, %d screens' %(n_trials, n_eyes, n_times, n_screens))
+results = []
+for label, func in [('legacy', legacy), ('gather', align_to_aoi)]:
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    results.append(func(data, screen, mapping))
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print('%-8s %8.2f s %8.0f MB peak (output %.0f MB)' %(label, elapsed, peak / 2**20, 
+                                                          results[-1].nbytes / 2**20))
+assert np.array_equal(results[0], results[1])
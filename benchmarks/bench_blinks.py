@@ -0,0 +1,58 @@
+"""Benchmark blink interpolation.
+
+Compares a per-blink loop (as commonly hand-written) against
+`nivlink.artifacts.interpolate_blinks`, for linear and cubic interpolation
+of pupil in both eyes of a simulated hour-long 1 kHz recording with a
+blink every 4 s on average.
+
+Usage: python benchmarks/bench_blinks.py [n_minutes]
+"""
+import sys, time
+import numpy as np
+from nivlink.artifacts import interpolate_blinks
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~#
+### Define benchmark.
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~#
+
+## Define metadata.
+n_minutes = float(sys.argv[1]) if len(sys.argv) > 1 else 60
+sfreq, pad = 1000, 50
+n_times = int(n_minutes * 60 * sfreq)
+rng = np.random.RandomState(47404)
+
+## Simulate recording and blinks (100-400 ms).
+data = 4000 + np.cumsum(rng.normal(0, 1, (n_times, 2, 3)), axis=0)
+onsets = np.sort(rng.choice(np.arange(sfreq, n_times - sfreq, 1000), n_times // (4 * sfreq), replace=False))
+blinks = np.column_stack([onsets, onsets + rng.randint(100, 400, onsets.size)])
+
+def loop(data, method):
+    for start, stop in blinks:
+        a, b = start - pad - 1, stop + pad
+        s = (np.arange(a + 1, b) - a) / (b - a)
+        for eye in range(data.shape[1]):
+            y0, y1 = data[a, eye, -1], data[b, eye, -1]
+            if method == 'linear':
+                data[a+1:b, eye, -1] = y0 + s * (y1 - y0)
+            else:
+                m0, m1 = (y0 - data[a-1, eye, -1]) * (b - a), (data[b+1, eye, -1] - y1) * (b - a)
+                data[a+1:b, eye, -1] = (2*s**3 - 3*s**2 + 1) * y0 + (s**3 - 2*s**2 + s) * m0 \
+                                     + (3*s**2 - 2*s**3) * y1 + (s**3 - s**2) * m1
+    return data
+
+def nivlink(data, method):
+    return interpolate_blinks(data, blinks, method, pad)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~#
+### Main loop.
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~#
+
+print('%d samples, %d blinks' %(n_times, blinks.shape[0]))
+for method in ('linear', 'cubic'):
+    results = []
+    for label, func in [('loop', loop), ('nivlink', nivlink)]:
+        arr = data.copy()
+        t0 = time.perf_counter()
+        results.append(func(arr, method))
+        print('%-7s %-11s %8.1f ms' %(method, label, (time.perf_counter() - t0) * 1e3))
+    assert np.allclose(results[0], results[1])
@@ -0,0 +1,67 @@
+"""Benchmark sample ingestion in edf_read.
+
+Compares the original ingestion strategy (per-sample tuples built by
+attribute access on FSAMPLE, collected in a list and converted to an
+array at the end) against copying FSAMPLE bytes into a preallocated
+record array. Samples are simulated from a single FSAMPLE struct so
+that no EDF file is required.
+
+Usage: python benchmarks/bench_edfread.py [n_samples]
+"""
+import sys, time, tracemalloc
+import numpy as np
+from ctypes import pointer
+from nivlink.edf.edfapi import FSAMPLE
+from nivlink.edf.edfread import _SampleBuffer, edf_sample_dtype, edf_format_samples
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~#
+### Define benchmark.
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~#
+
+## Define metadata.
+n_samples = int(sys.argv[1]) if len(sys.argv) > 1 else 2000000
+ch_names = ('gx','gy','pupil')
+
+## Define sample.
+sample = FSAMPLE()
+sample.gx[:] = [500, 501]
+sample.gy[:] = [400, 401]
+sample.pa[:] = [4000, 4001]
+ptr = pointer(sample)
+
+def ingest_list(n):
+    samples = []
+    for _ in range(n):
+        s = ptr.contents
+        samples.append((s.time, s.gx[0], s.gx[1], s.gy[0], s.gy[1], s.pa[0], s.pa[1]))
+    samples = np.array(samples, dtype=np.float64)
+    return samples[:,1:].reshape(-1, 2, 3, order='F')
+
+def ingest_records(n):
+    samples = _SampleBuffer(edf_sample_dtype(ch_names), n)
+    for _ in range(n): samples.append(ptr)
+    _, data, _ = edf_format_samples(samples.finalize(), ch_names, 'BOTH')
+    return data
+
+def profile(func, n):
+    t0 = time.perf_counter()
+    func(n)
+    elapsed = time.perf_counter() - t0
+    tracemalloc.start()
+    func(n)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1e6
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~#
+### Run benchmark.
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~#
+
+if __name__ == '__main__':
+
+    assert np.array_equal(ingest_list(1000), ingest_records(1000))
+
+    print('%d samples' %n_samples)
+    for name, func in [('list of tuples', ingest_list), ('record array', ingest_records)]:
+        elapsed, peak = profile(func, n_samples)
+        print('%-20s %8.2f s %10.1f MB peak' %(name, elapsed, peak))
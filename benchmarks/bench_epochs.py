@@ -0,0 +1,50 @@
+"""Benchmark epoch extraction.
+
+Compares the original per-trial loop (deepcopy of each window into a
+NaN-filled array, then moving the time axis) against the gather used by
+`Epochs`. Samples are simulated (binocular gaze and pupil at 500 Hz).
+
+Usage: python benchmarks/bench_epochs.py [n_trials]
+"""
+import sys, time
+import numpy as np
+from copy import deepcopy
+from nivlink.epochs import _gather_epochs
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~#
+### Define benchmark.
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~#
+
+## Define metadata.
+n_trials = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+sfreq, tmin, tmax = 500, -0.5, 3.0
+n_times = int((tmax - tmin) * sfreq)
+rng = np.random.RandomState(47404)
+
+## Simulate recording and events.
+data = rng.normal(0, 1, (n_trials * n_times + n_times, 2, 3))
+events = np.arange(n_trials) * n_times - int(tmin * sfreq)
+raw_ix = np.column_stack([events + int(tmin * sfreq), events + int(tmax * sfreq)])
+epoch_ix = np.column_stack([np.zeros(n_trials, int), np.full(n_trials, n_times)])
+eye_ix, ch_ix = np.array([True, True]), np.array([True, False, True])
+
+def loop():
+    epochs = np.ones((n_trials, n_times, eye_ix.sum(), ch_ix.sum())) * np.nan
+    for i, (r1, r2, e1, e2) in enumerate(np.column_stack((raw_ix, epoch_ix))):
+        epochs[i,e1:e2,...] = deepcopy(data[r1:r2,eye_ix][...,ch_ix])
+    return np.moveaxis(epochs, 1, -1)
+
+def gather():
+    return _gather_epochs(data, raw_ix, epoch_ix, n_times, np.flatnonzero(eye_ix), np.flatnonzero(ch_ix))
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~#
+### Main loop.
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~#
+
+print('%d trials x %d samples' %(n_trials, n_times))
+results = []
+for label, func in [('loop', loop), ('gather', gather)]:
+    t0 = time.perf_counter()
+    results.append(func())
+    print('%-8s %8.2f s' %(label, time.perf_counter() - t0))
+assert np.array_equal(results[0], results[1])
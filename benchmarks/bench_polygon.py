@@ -0,0 +1,57 @@
+"""Benchmark rasterization of polygon AoIs.
+
+Compares an even-odd (PNPOLY) test of every pixel of the screen against
+the scanline fill of `Screen.add_polygon_aoi`, for irregular polygons
+(e.g. outlines of faces) on a 1920 x 1080 display.
+
+Usage: python benchmarks/bench_polygon.py [n_vertices]
+"""
+import sys, time
+import numpy as np
+from nivlink import Screen
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~#
+### Define benchmark.
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~#
+
+## Define metadata.
+n_vertices = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+xdim, ydim, n_polygons = 1920, 1080, 6
+rng = np.random.RandomState(47404)
+
+## Simulate polygons (star-shaped outlines with jittered radii).
+angles = np.linspace(0, 2 * np.pi, n_vertices, endpoint=False)
+polygons = []
+for k in range(n_polygons):
+    center = [300 + 650 * (k % 3), 270 + 540 * (k // 3)]
+    radii = rng.uniform(120, 250, n_vertices)
+    polygons.append(np.column_stack([center[0] + radii * np.cos(angles), 
+                                     center[1] + radii * np.sin(angles)]))
+
+def brute_force():
+    screen = Screen(xdim, ydim)
+    X, Y = np.meshgrid(np.arange(xdim), np.arange(ydim), indexing='ij')
+    for vertices in polygons:
+        inside = np.zeros((xdim, ydim), dtype=bool)
+        for (xi, yi), (xj, yj) in zip(vertices, np.roll(vertices, -1, axis=0)):
+            cross = (yi > Y) != (yj > Y)
+            inside[cross] ^= X[cross] < (xj - xi) * (Y[cross] - yi) / (yj - yi) + xi
+        screen.add_mask_aoi(inside)
+    return screen.indices
+
+def scanline():
+    screen = Screen(xdim, ydim)
+    for vertices in polygons: screen.add_polygon_aoi(vertices)
+    return screen.indices
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~#
+### Main loop.
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~#
+
+print('%d polygons x %d vertices, %d x %d pixels' %(n_polygons, n_vertices, xdim, ydim))
+results = []
+for label, func in [('brute', brute_force), ('scanline', scanline)]:
+    t0 = time.perf_counter()
+    results.append(func())
+    print('%-8s %8.3f s' %(label, time.perf_counter() - t0))
+assert np.array_equal(results[0], results[1])
@@ -0,0 +1,54 @@
+"""Benchmark parallel reading of many raw files with `read_raws`.
+
+Simulates binocular ASC files (as converted from EDF by `edf2asc`) and
+reads them with an increasing number of worker processes.
+
+Usage: python benchmarks/bench_read_raws.py [n_files] [n_samples]
+"""
+import os, sys, time, shutil, tempfile
+import numpy as np
+from nivlink import read_raws
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~#
+### Simulate files.
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~#
+
+## Define metadata.
+n_files = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+n_samples = int(sys.argv[2]) if len(sys.argv) > 2 else 500000
+rng = np.random.RandomState(47404)
+
+header = ('** DATE: Wed Mar  8 09:25:20 2017\n'
+          'START\t1000 \tLEFT\tRIGHT\tSAMPLES\tEVENTS\n'
+          'PUPIL\tAREA\n'
+          'SAMPLES\tGAZE\tLEFT\tRIGHT\tRATE\t 1000.00\tTRACKING\tCR\tFILTER\t2\n')
+
+root = tempfile.mkdtemp()
+times = np.arange(n_samples) + 1000
+samples = np.round(np.cumsum(rng.normal(0, 1, (n_samples, 6)), axis=0) + 500, 1)
+lines = ['%d\t%s\t.....' %(t, '\t'.join('%.1f' %v for v in row)) for t, row in zip(times, samples)]
+for i in range(0, n_samples, 1000): lines[i] += '\nMSG\t%d TRIALID %d' %(times[i], i)
+text = header + '\n'.join(lines) + '\n'
+
+fnames = []
+for i in range(n_files):
+    fnames.append(os.path.join(root, 'sub%02d.asc' %i))
+    with open(fnames[-1], 'w') as f: f.write(text)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~#
+### Main loop.
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~#
+
+n_cpus = os.cpu_count()
+print('%d files x %d samples, %d CPUs' %(n_files, n_samples, n_cpus))
+print('%8s %10s %10s' %('n_jobs', 'time (s)', 'speedup'))
+n_jobs, baseline = 1, None
+while n_jobs <= n_cpus:
+    t0 = time.perf_counter()
+    raws = read_raws(fnames, n_jobs=n_jobs)
+    elapsed = time.perf_counter() - t0
+    baseline = baseline or elapsed
+    print('%8d %10.2f %10.2f' %(n_jobs, elapsed, baseline / elapsed))
+    n_jobs *= 2
+
+shutil.rmtree(root)
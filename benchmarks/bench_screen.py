@@ -0,0 +1,69 @@
+"""Benchmark memory and speed of Screen backends.
+
+Compares the original float64 look-up table (relabeled with `np.unique`
+after each AoI), the compact unsigned integer table (labeled incrementally
+and compacted once), and the vector backend (no look-up table), when 
+building the MOAT screens on a 1920 x 1080 display, and when aligning 
+simulated gaze data to them.
+
+Usage: python benchmarks/bench_screen.py [n_trials]
+"""
+import sys, time
+import numpy as np
+from nivlink import Screen, align_to_aoi
+from nivlink.projects.moat import set_screen_moat
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~#
+### Define benchmark.
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~#
+
+## Define metadata.
+n_trials = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+xdim, ydim, n_screens = 1920, 1080, 4
+n_eyes, n_times = 2, 1500
+rng = np.random.RandomState(47404)
+
+class LegacyScreen(Screen):
+    """Screen with float64 look-up table, relabeled with np.unique after each AoI."""
+
+    def __init__(self, xdim, ydim, n_screens=1):
+        Screen.__init__(self, xdim, ydim, n_screens)
+        self._indices = np.zeros((xdim,ydim,n_screens))
+
+    def _next_label(self):
+        self.finalize()
+        self._finalized = False
+        return self._indices.max() + 1
+
+    def finalize(self):
+        values, indices = np.unique(self._indices, return_inverse=True)
+        if np.all(values): indices += 1
+        self._indices = indices.reshape(self.xdim, self.ydim, self.n_screens)
+        self._n_labels, self._finalized = int(self._indices.max()), True
+
+## Simulate gaze data and mapping.
+data = rng.uniform(0, 1920, (n_trials, n_eyes, 2, n_times))
+mapping = rng.randint(0, n_screens, n_trials)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~#
+### Main loop.
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~#
+
+print('%d x %d pixels, %d screens; %d trials x %d eyes x %d samples' 
+      %(xdim, ydim, n_screens, n_trials, n_eyes, n_times))
+results = []
+backends = [('legacy', LegacyScreen, {}), ('compact', Screen, {}), 
+            ('vector', Screen, dict(backend='vector'))]
+for label, cls, kwargs in backends:
+    t0 = time.perf_counter()
+    screen = cls(xdim, ydim, n_screens, **kwargs)
+    set_screen_moat(screen)
+    screen.finalize()
+    build = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    results.append(align_to_aoi(data, screen, mapping))
+    align = time.perf_counter() - t0
+    table = 0 if screen._indices is None else screen._indices.nbytes
+    print('%-8s %-7s table %6.1f MB   build %6.2f s   align %6.2f s   output %6.1f MB' 
+          %(label, results[-1].dtype, table / 2**20, build, align, results[-1].nbytes / 2**20))
+assert all(np.array_equal(results[0], result) for result in results[1:])
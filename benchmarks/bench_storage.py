@@ -0,0 +1,71 @@
+"""Benchmark Raw storage formats.
+
+Compares NumPy compressed files (`Raw.save`), uncompressed memory-mapped
+directories (`Raw.save(compress=False)`) and chunked storage
+(`Raw.save(chunks=...)`) by file size, time to open, and latency of reading
+single epochs of one channel. Samples are simulated (binocular gaze and
+pupil at 1000 Hz, rounded to 0.1 as in EDF files).
+
+Usage: python benchmarks/bench_storage.py [n_samples]
+"""
+import os, sys, time, shutil, tempfile
+import numpy as np
+from nivlink import Raw
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~#
+### Define benchmark.
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~#
+
+## Define metadata.
+n_samples = int(sys.argv[1]) if len(sys.argv) > 1 else 3600000
+n_epochs, epoch_len = 200, 2000
+rng = np.random.RandomState(47404)
+
+## Simulate recording (random walks).
+data = np.cumsum(rng.normal(0, 1, (n_samples, 2, 3)), axis=0)
+data += [500, 400, 4000]
+data = np.round(data, 1)
+messages = np.array([(0, 'START')], dtype=[('sample',int),('message',np.unicode_,80)])
+
+root = tempfile.mkdtemp()
+src = os.path.join(root, 'src.npz')
+np.savez_compressed(src, info=dict(sfreq=1000), data=data, blinks=np.empty((0,2), int),
+                    saccades=np.empty((0,2), int), messages=messages,
+                    ch_names=('gx','gy','pupil'), eye_names=('LEFT','RIGHT'))
+raw = Raw(src)
+starts = rng.randint(0, n_samples - epoch_len, n_epochs)
+
+def size(path):
+    if os.path.isfile(path): return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, fs in os.walk(path) for f in fs)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~#
+### Main loop.
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~#
+
+formats = [
+    ('npz', 'raw.npz', dict()),
+    ('mmap', 'raw_mmap', dict(compress=False)),
+    ('chunked (shuffle)', 'raw_shuffle', dict(chunks=8192)),
+    ('chunked (zlib)', 'raw_zlib', dict(chunks=8192, codec='zlib')),
+]
+
+print('%-18s %10s %10s %14s' %('format', 'size (MB)', 'open (ms)', 'epoch (ms)'))
+for label, name, kwargs in formats:
+    fname = os.path.join(root, name)
+    raw.save(fname, **kwargs)
+
+    t0 = time.perf_counter()
+    copy = Raw(fname)
+    t_open = time.perf_counter() - t0
+
+    ## Read pupil of right eye for each epoch.
+    t0 = time.perf_counter()
+    for start in starts:
+        if hasattr(copy.data, 'oindex'): copy.data.oindex[start:start+epoch_len, 1, 2]
+        else: np.array(copy.data[start:start+epoch_len, 1, 2])
+    t_epoch = (time.perf_counter() - t0) / n_epochs
+
+    print('%-18s %10.1f %10.1f %14.3f' %(label, size(fname) / 1e6, t_open * 1e3, t_epoch * 1e3))
+
+shutil.rmtree(root)
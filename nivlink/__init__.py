@@ -2,7 +2,7 @@
 
 __version__ = '0.2.5'
 
-from .raw import (Raw)
+from .raw import (Raw, read_raws)
 from .epochs import (Epochs)
 from .gaze import (align_to_aoi, compute_fixations)
 from .screen import (Screen)
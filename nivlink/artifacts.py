@@ -0,0 +1,207 @@
+import numpy as np
+
+class IntervalIndex(object):
+    """Sorted index of intervals (e.g. blinks, saccades) for overlap queries.
+
+    Parameters
+    ----------
+    intervals : array, shape (n_intervals, 2)
+        Onset and offset of intervals (in samples). Offsets are exclusive.
+
+    Attributes
+    ----------
+    intervals : array, shape (n_intervals, 2)
+        Intervals as given.
+    order : array, shape (n_intervals,)
+        Indices sorting intervals by onset.
+
+    Notes
+    -----
+    Intervals are sorted by onset, and the running maximum of their offsets
+    is kept. The intervals overlapping a window are then a contiguous range
+    of the sorted intervals (found by binary search), less any nested
+    intervals that end before the window starts. Queries take
+    O(log n + k) time for k candidate intervals.
+    """
+
+    def __init__(self, intervals):
+        self.intervals = np.reshape(intervals, (-1, 2))
+        self.order = np.argsort(self.intervals[:,0], kind='stable')
+        self._starts = self.intervals[self.order,0]
+        self._max_ends = np.maximum.accumulate(self.intervals[self.order,1]) \
+                         if self.order.size else self._starts
+
+    def __len__(self):
+        return self.intervals.shape[0]
+
+    def __repr__(self):
+        return '<IntervalIndex | {0} intervals>'.format(len(self))
+
+    def query(self, start, stop):
+        """Find intervals overlapping a window.
+
+        Parameters
+        ----------
+        start, stop : int
+            Onset and (exclusive) offset of window.
+
+        Returns
+        -------
+        ix : array
+            Indices of overlapping intervals, in ascending order.
+        """
+        _, ix = self.query_many([[start, stop]])
+        return ix
+
+    def query_many(self, windows):
+        """Find intervals overlapping each of many windows.
+
+        Parameters
+        ----------
+        windows : array, shape (n_windows, 2)
+            Onset and (exclusive) offset of windows.
+
+        Returns
+        -------
+        windows : array, shape (k,)
+            Index of window of each overlap.
+        ix : array, shape (k,)
+            Index of interval of each overlap. Overlaps are sorted by window,
+            then interval.
+        """
+        windows = np.reshape(windows, (-1, 2))
+
+        ## Candidates start before window offset, and (by running maximum)
+        ## follow the last interval ending before window onset.
+        hi = np.searchsorted(self._starts, windows[:,1], side='left')
+        lo = np.searchsorted(self._max_ends, windows[:,0], side='right')
+        counts = np.maximum(hi - lo, 0)
+
+        ## Enumerate candidates; drop nested intervals ending before window onset.
+        trials = np.repeat(np.arange(windows.shape[0]), counts)
+        ix = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts - lo, counts)
+        ix = self.order[ix]
+        keep = self.intervals[ix,1] > windows[trials,0]
+        trials, ix = trials[keep], ix[keep]
+
+        ## Sort by window, then interval.
+        sort = np.lexsort((ix, trials))
+        return trials[sort], ix[sort]
+
+def interpolate_blinks(data, blinks, method='linear', pad=0, channels=(-1,), offset=0):
+    """Interpolate recording samples across blinks (in place).
+
+    Parameters
+    ----------
+    data : array, shape (n_times, n_eyes, n_channels)
+        Recording samples (e.g. `Raw.data`, or a block from `Raw.iter_chunks`).
+    blinks : array, shape (n_blinks, 2)
+        Onset and (exclusive) offset of blinks (in samples).
+    method : 'linear' | 'cubic'
+        Interpolation method. If 'cubic', gaps are filled with a cubic Hermite
+        spline matching the values and slopes of the samples around them.
+    pad : int
+        Number of samples to extend each blink by on either side.
+    channels : list
+        Indices of channels to interpolate (by default, the last channel, 
+        i.e. pupil).
+    offset : int
+        Sample index of the first sample in `data` (blinks are shifted by 
+        `-offset`, as for blocks of a longer recording).
+
+    Returns
+    -------
+    data : array, shape (n_times, n_eyes, n_channels)
+        Recording samples, interpolated across blinks in all eyes.
+
+    Notes
+    -----
+    Overlapping (padded) blinks are merged into gaps by sorting them by
+    onset, without scanning the whole recording. The interpolating polynomial
+    of each gap is fit to its bounding samples (the last sample before and
+    first sample after the gap), for all gaps at once. Cubic splines are then
+    evaluated for all gaps in a single vectorized operation. Lines are cheap
+    enough that this costs more than it saves, and are written gap by gap
+    (with one multiply-add per gap, eye and channel). Gaps at the start or 
+    end of `data` are filled with their one bounding sample, and gaps spanning
+    all of `data` are left as is. Values are rounded for integer data.
+    """
+    if method not in ('linear', 'cubic'): raise ValueError('method must be "linear" or "cubic".')
+    n_times = data.shape[0]
+    blinks = np.reshape(blinks, (-1, 2)) - offset
+    channels = np.atleast_1d(channels)
+
+    ## Merge overlapping or adjacent (padded) blinks into gaps.
+    starts = np.clip(blinks[:,0] - pad, 0, n_times)
+    stops = np.clip(blinks[:,1] + pad, 0, n_times)
+    order = np.argsort(starts[stops > starts], kind='stable')
+    starts, stops = starts[stops > starts][order], stops[stops > starts][order]
+    if not starts.size: return data
+    stops = np.maximum.accumulate(stops)
+    new = np.concatenate([[True], starts[1:] > stops[:-1]])
+    starts, stops = starts[new], stops[np.append(np.flatnonzero(new)[1:] - 1, -1)]
+    
+    ## Gaps spanning all samples cannot be interpolated.
+    keep = np.logical_or(starts > 0, stops < n_times)
+    starts, stops = starts[keep], stops[keep]
+    if not starts.size: return data
+
+    ## Define bounding samples of gaps (gaps at edges are bounded on one side).
+    x0 = np.where(starts > 0, starts - 1, stops)
+    x1 = np.where(stops < n_times, stops, x0)
+    h = (x1 - x0)[:,np.newaxis]
+
+    ## Define values and slopes (per gap length) at bounding samples, as
+    ## arrays of shape (n_gaps, n_eyes * n_channels).
+    eyes = np.arange(data.shape[1])
+    ftype = np.promote_types(data.dtype, np.float32)
+    anchor = lambda ix: data[np.ix_(ix, eyes, channels)].reshape(ix.size, -1).astype(ftype)
+    y0, y1 = anchor(x0), anchor(x1)
+    if method == 'linear':
+        
+        ## Fill each gap of each eye and channel with a line through its bounding 
+        ## samples, using one multiply-add per gap (written in place for float
+        ## data). Each line starts one sample after x0 (or is constant, for gaps
+        ## at edges).
+        slope = np.divide(y1 - y0, h, out=np.zeros(y0.shape), where=h > 0)
+        lengths = stops - starts
+        steps = np.arange(1, lengths.max() + 1, dtype=float)
+        buffer = None if data.dtype.kind == 'f' else np.empty(lengths.max())
+        columns = [data[:,e,c] for e in eyes for c in channels]
+        for start, stop, values, slopes in zip(starts.tolist(), stops.tolist(), 
+                                               y0.tolist(), slope.tolist()):
+            for column, y, m in zip(columns, values, slopes):
+                line = column[start:stop] if buffer is None else buffer[:stop - start]
+                np.multiply(steps[:stop - start], m, out=line)
+                line += y
+                if buffer is not None: column[start:stop] = np.rint(line, out=line)
+        return data
+    
+    ## Cubic Hermite spline as polynomial in s = (t - x0) / (x1 - x0).
+    m0 = (y0 - anchor(np.maximum(x0 - 1, 0))) * h
+    m1 = (anchor(np.minimum(x1 + 1, n_times - 1)) - y1) * h
+    coefs = [y0, m0, 3 * (y1 - y0) - 2 * m0 - m1, 2 * (y0 - y1) + m0 + m1]
+
+    ## Enumerate samples in gaps, and evaluate polynomial of their gap.
+    lengths = stops - starts
+    gap = np.repeat(np.arange(starts.size), lengths)
+    pos = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    t = pos + np.repeat(starts, lengths)
+    s = (pos + starts[gap] - x0[gap]) * np.repeat(np.divide(1, h[:,0], out=np.zeros(h.shape[0]), 
+                                                            where=h[:,0] > 0), lengths)
+    s = s[:,np.newaxis]
+    values = np.take(coefs[-1], gap, axis=0)
+    for c in coefs[-2::-1]:
+        values *= s
+        values += np.take(c, gap, axis=0)
+
+    ## Write values (through flat indices, if possible), rounding for integer data.
+    if data.dtype.kind != 'f': np.rint(values, out=values)
+    if data.flags.c_contiguous:
+        columns = (eyes[:,np.newaxis] * data.shape[2] + channels % data.shape[2]).ravel()
+        flat = (t[:,np.newaxis] * (data.shape[1] * data.shape[2]) + columns).ravel()
+        data.reshape(-1)[flat] = values.ravel()
+    else:
+        data[np.ix_(t, eyes, channels)] = values.reshape(t.size, eyes.size, channels.size)
+
+    return data
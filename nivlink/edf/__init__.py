@@ -1,3 +1,10 @@
 """Functions for reading EyeLink EDF files."""
 
-from .edfread import edf_read
\ No newline at end of file
+from .ascread import asc_read
+
+def __getattr__(name):
+    """Defer loading the EDF API library until the EDF reader is first used."""
+    if name in ('edf_read', 'iter_edf'):
+        from . import edfread
+        return getattr(edfread, name)
+    raise AttributeError('module %r has no attribute %r' %(__name__, name))
@@ -0,0 +1,203 @@
+import os, re
+from io import StringIO
+from numpy import concatenate, empty, float64, full, isnan
+from .constants import default_fields, missing_data
+from .utils import (parse_preamble, align_events, check_dtype, convert_samples, 
+                    missing_value)
+
+## Event lines are any lines not starting with a digit (sample lines do).
+event_line = re.compile(r'^[^\d\n].*$', re.MULTILINE)
+
+## SAMPLES lines define the column layout of the sample lines following them.
+samples_line = re.compile(r'^(SAMPLES\b.*)$', re.MULTILINE)
+
+def asc_columns(line, ch_names):
+    """Locate channels in ASC sample lines.
+
+    Parameters
+    ----------
+    line : str
+        SAMPLES line from ASC file (e.g. "SAMPLES GAZE LEFT RIGHT RATE 500.00 ...").
+    ch_names : list
+        Channels to extract. Supported channels are 'gx', 'gy', 'pupil', and
+        (if recorded) 'gxvel', 'gyvel', 'rx', 'ry'.
+
+    Returns
+    -------
+    info : dict
+        Recording info: sample rate, eye info.
+    columns : array, shape (n_eyes, n_channels)
+        Column index of each channel for each eye.
+    """
+
+    tokens = line.split()
+    info = dict()
+
+    ## Define recording info.
+    if 'RATE' in tokens: info['sfreq'] = float(tokens[tokens.index('RATE') + 1])
+    eyes = [eye for eye in ('LEFT','RIGHT') if eye in tokens]
+    info['eye'] = 'BOTH' if len(eyes) == 2 else eyes[0]
+
+    ## Define column layout: time, (x, y, pupil) per eye, (xvel, yvel) per eye, (xres, yres).
+    n_eyes = len(eyes)
+    layout = dict()
+    for i in range(n_eyes):
+        layout[i, 'gx'] = 1 + 3*i
+        layout[i, 'gy'] = 2 + 3*i
+        layout[i, 'pupil'] = 3 + 3*i
+    n_cols = 1 + 3 * n_eyes
+    if 'VEL' in tokens:
+        for i in range(n_eyes):
+            layout[i, 'gxvel'] = n_cols + 2*i
+            layout[i, 'gyvel'] = n_cols + 2*i + 1
+        n_cols += 2 * n_eyes
+    if 'RES' in tokens:
+        for i in range(n_eyes):
+            layout[i, 'rx'] = n_cols
+            layout[i, 'ry'] = n_cols + 1
+
+    ## Error-catching.
+    invalid = [ch for ch in ch_names if (0, ch) not in layout]
+    if invalid: raise ValueError('Channels not found in ASC file: %s' %', '.join(invalid))
+
+    columns = [[layout[i, ch] for ch in ch_names] for i in range(n_eyes)]
+    return info, columns
+
+def asc_parse_samples(text, columns):
+    """Parse block of sample lines into array of shape (n, 1 + n_eyes * n_channels)."""
+    from pandas import read_csv
+
+    usecols = sorted(set([0] + [c for eye in columns for c in eye]))
+    samples = read_csv(StringIO(text), sep=r'\s+', header=None, usecols=usecols,
+                       na_values='.', dtype=float64, engine='c').values
+
+    ## Reorder columns as (time, eye 1 channels, eye 2 channels, ...).
+    order = [usecols.index(0)] + [usecols.index(c) for eye in columns for c in eye]
+    samples = samples[:, order]
+    samples[isnan(samples)] = missing_data
+    return samples
+
+def asc_parse_events(lines, info, blinks, saccades, messages):
+    """Parse event lines. Updates info, blinks, saccades, and messages in place."""
+    for line in lines:
+        if line.startswith('MSG'):
+            _, time, message = (line.split(None, 2) + [''])[:3]
+            messages.append((float(time), message.strip()))
+        elif line.startswith('EBLINK'):
+            tokens = line.split()
+            blinks.append((float(tokens[2]), float(tokens[3])))
+        elif line.startswith('ESACC'):
+            tokens = line.split()
+            saccades.append((float(tokens[2]), float(tokens[3])))
+        elif line.startswith('PUPIL'):
+            info['pupil'] = line.split()[1]
+        elif line.startswith('**'):
+            info.update(parse_preamble(line))
+
+def asc_read(fname, fields=None, chunksize=2**24, dtype=float64):
+    """Read and parse ASC file (as converted from EDF by `edf2asc`).
+
+    Parameters
+    ----------
+    fname : str
+        Path to ASC file.
+    fields : list | None
+        Sample channels to read ('gx', 'gy', 'pupil', and if recorded,
+        'gxvel', 'gyvel', 'rx', 'ry'). Defaults to ('gx', 'gy', 'pupil').
+    chunksize : int
+        Number of bytes of text to parse at a time.
+    dtype : dtype
+        Data type of samples. See `edf_read`.
+
+    Returns
+    -------
+    info : dict
+        ASC file metadata.
+    data : array, shape (n, n_eyes, n_channels)
+        Recording samples of the requested channels.
+    blinks : array, shape (i, 2)
+        Detected blinks detailed by their start and end.
+    saccades : array, shape (j, 2)
+        Detected saccades detailed by their start and end.
+    messages : array, shape (k, 2)
+        Detected messages detailed by their time and message.
+    ch_names : tuple
+        Names of data channels.
+    eye_names : tuple
+        Order of data channels (by eye).
+
+    Notes
+    -----
+    The file is read in blocks of `chunksize` bytes. Each block is split at
+    SAMPLES lines, so that sample lines are parsed with the column layout of 
+    the recording they belong to (which may change, e.g. from monocular to 
+    binocular, between recordings). Within each segment, event lines are 
+    separated from sample lines by a single regular expression pass, and 
+    sample lines are parsed by the pandas C engine. Missing samples ('.'),
+    and samples of an eye not recorded in a segment, are set to the value 
+    used in EDF files (1e8).
+    """
+
+    ## Define channels.
+    ch_names = default_fields if fields is None else tuple(fields)
+    if not os.path.isfile(fname): raise IOError('File not found.')
+
+    ## Preallocate space.
+    info, columns, eyes = dict(), None, None
+    times, data, blinks, saccades, messages = [], [], [], [], []
+    dtype = check_dtype(dtype)
+
+    ## Main loop.
+    with open(fname, 'r') as fid:
+
+        while True:
+
+            ## Read next block of complete lines.
+            text = ''.join(fid.readlines(chunksize))
+            if not text: break
+
+            ## Split block at SAMPLES lines, i.e. into [text, SAMPLES line, text, ...].
+            segments = samples_line.split(text)
+            for i, segment in enumerate(segments):
+                
+                if i % 2:
+                    recording, columns = asc_columns(segment, ch_names)
+                    info.update(recording)
+                    eyes = ('LEFT', 'RIGHT') if recording['eye'] == 'BOTH' else (recording['eye'],)
+                    continue
+
+                ## Split event lines from sample lines.
+                events = event_line.findall(segment)
+                asc_parse_events(events, info, blinks, saccades, messages)
+
+                ## Parse sample lines.
+                segment = event_line.sub('', segment)
+                if columns is not None and segment.strip():
+                    samples = asc_parse_samples(segment, columns)
+                    times.append(samples[:,0])
+                    samples = convert_samples(samples[:,1:], dtype)
+                    data.append((eyes, samples.reshape(samples.shape[0], -1, len(ch_names))))
+
+    ## Define eye names (all eyes recorded in any segment).
+    if info.get('eye') is None: raise ValueError('No SAMPLES line found in ASC file.')
+    eye_names = tuple(eye for eye in ('LEFT', 'RIGHT') if any(eye in e for e, _ in data))
+    if not eye_names: eye_names = eyes
+    info['eye'] = 'BOTH' if len(eye_names) == 2 else eye_names[0]
+
+    ## Extract data (eyes not recorded in a segment are missing).
+    times = concatenate(times) if times else empty(0)
+    if all(e == eye_names for e, _ in data):
+        data = concatenate([arr for _, arr in data]) if data else \
+               empty((0, len(eye_names), len(ch_names)), dtype=dtype)
+    else:
+        out = full((times.shape[0], len(eye_names), len(ch_names)), missing_value(dtype), dtype=dtype)
+        start = 0
+        for e, arr in data:
+            out[start:start + arr.shape[0], [eye_names.index(eye) for eye in e]] = arr
+            start += arr.shape[0]
+        data = out
+
+    ## Convert event times to samples.
+    blinks, saccades, messages = align_events(times, blinks, saccades, messages)
+
+    return info, data, blinks, saccades, messages, ch_names, eye_names
@@ -0,0 +1,159 @@
+"""Persistent cache of parsed EDF and ASC files."""
+
+import os, json, shutil, hashlib
+import numpy as np
+from contextlib import contextmanager
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+def file_key(fname, fields=None, content_hash=False, dtype=np.float64):
+    """Compute cache key of a raw file.
+
+    Parameters
+    ----------
+    fname : str
+        Path to EDF or ASC file.
+    fields : list | None
+        Sample channels read from the file.
+    content_hash : bool
+        If True, include a SHA-256 digest of the file contents. Otherwise the
+        key depends only on the path, size and modification time.
+    dtype : dtype
+        Data type of samples read from the file.
+
+    Returns
+    -------
+    key : str
+        Hexadecimal key.
+    """
+    fname = os.path.abspath(fname)
+    stat = os.stat(fname)
+    ident = [fname, stat.st_size, stat.st_mtime_ns, None if fields is None else list(fields),
+             np.dtype(dtype).str]
+    if content_hash:
+        digest = hashlib.sha256()
+        with open(fname, 'rb') as f:
+            for block in iter(lambda: f.read(2**20), b''): digest.update(block)
+        ident.append(digest.hexdigest())
+    return hashlib.sha1(json.dumps(ident).encode()).hexdigest()
+
+def _dir_size(path):
+    """Total size (in bytes) of files in directory."""
+    return sum(os.path.getsize(os.path.join(root, f))
+               for root, _, files in os.walk(path) for f in files)
+
+class EDFCache(object):
+    """Cache of parsed raw files, stored in the uncompressed Raw format.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Directory holding cache entries (created if it does not exist).
+    max_size : int
+        Maximum total size of cache entries (in bytes). When exceeded, the
+        least recently used entries are removed.
+    content_hash : bool
+        If True, entries are keyed on file contents (as well as path, size
+        and modification time). Slower, as each lookup reads the whole file.
+
+    Notes
+    -----
+    Entries are written to a temporary directory and renamed into place, so
+    a partially written entry is never visible. Insertion and eviction hold
+    an exclusive lock on the cache (`fcntl.flock`, where available) and
+    lookups a shared lock, so that several processes on the same node may
+    share one cache. Cached data are memory-mapped on load; on POSIX systems
+    an evicted entry remains readable by processes that already opened it.
+    """
+
+    def __init__(self, cache_dir, max_size=10 * 2**30, content_hash=False):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.content_hash = content_hash
+        if not os.path.isdir(cache_dir): os.makedirs(cache_dir)
+
+    def __repr__(self):
+        return '<EDFCache | {0}>'.format(self.cache_dir)
+
+    @contextmanager
+    def _lock(self, exclusive):
+        """Hold a lock on the cache directory."""
+        with open(os.path.join(self.cache_dir, '.lock'), 'a') as f:
+            if fcntl is not None: fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                if fcntl is not None: fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _entries(self):
+        """Return list of (path, last access) of cache entries."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.startswith('.') or not os.path.isdir(path): continue
+            entries.append((path, os.stat(path).st_mtime))
+        return entries
+
+    def _evict(self, keep):
+        """Remove least recently used entries until cache fits in max_size."""
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        sizes = dict((path, _dir_size(path)) for path, _ in entries)
+        total = sum(sizes.values())
+        for path, _ in entries:
+            if total <= self.max_size: break
+            if path == keep: continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= sizes[path]
+
+    def clear(self):
+        """Remove all cache entries."""
+        with self._lock(exclusive=True):
+            for path, _ in self._entries(): shutil.rmtree(path, ignore_errors=True)
+
+    def read(self, fname, fields=None, mmap_mode='r', dtype=np.float64):
+        """Read raw file, parsing it only if it is not already cached.
+
+        Parameters
+        ----------
+        fname : str
+            Path to EDF or ASC file.
+        fields : list | None
+            Sample channels to read.
+        mmap_mode : 'r' | 'c' | None
+            Memory-map mode of cached data.
+        dtype : dtype
+            Data type of samples (see `edf_read`).
+
+        Returns
+        -------
+        info, data, blinks, saccades, messages, ch_names, eye_names
+            As returned by `edf_read`.
+        """
+        from ..raw import _load_dir, _save_dir
+        key = file_key(fname, fields, self.content_hash, dtype)
+        path = os.path.join(self.cache_dir, key)
+
+        ## Cache hit: mark as recently used.
+        with self._lock(exclusive=False):
+            if os.path.isdir(path):
+                os.utime(path)
+                return _load_dir(path, mmap_mode)
+
+        ## Cache miss: parse file.
+        if fname.lower().endswith('.asc'):
+            from .ascread import asc_read as reader
+        else:
+            from .edfread import edf_read as reader
+        parsed = reader(fname, fields, dtype=dtype)
+
+        ## Write entry outside of lock, then move into place.
+        tmp = os.path.join(self.cache_dir, '.%s.%s.tmp' %(key, os.getpid()))
+        _save_dir(tmp, *parsed)
+        with self._lock(exclusive=True):
+            if os.path.isdir(path): shutil.rmtree(tmp)    # Another process won.
+            else: os.rename(tmp, path)
+            os.utime(path)
+            self._evict(keep=path)
+            return _load_dir(path, mmap_mode)
@@ -29,4 +29,46 @@ event_codes = invert_dict(dict(
     SAMPLES         = 200,
     LOST_DATA_EVENT = 0x3F
     
-))
\ No newline at end of file
+))
+
+## Channels available from FSAMPLE. Maps channel name to 
+## (FSAMPLE attribute, True if recorded separately per eye).
+sample_fields = dict(
+
+    gx      = ('gx', True),         # screen gaze x
+    gy      = ('gy', True),         # screen gaze y
+    pupil   = ('pa', True),         # pupil size or area
+    px      = ('px', True),         # pupil x
+    py      = ('py', True),         # pupil y
+    hx      = ('hx', True),         # headref x
+    hy      = ('hy', True),         # headref y
+    rx      = ('rx', False),        # screen pixels per degree x
+    ry      = ('ry', False),        # screen pixels per degree y
+    gxvel   = ('gxvel', True),      # gaze x velocity
+    gyvel   = ('gyvel', True),      # gaze y velocity
+    hxvel   = ('hxvel', True),      # headref x velocity
+    hyvel   = ('hyvel', True),      # headref y velocity
+    rxvel   = ('rxvel', True),      # raw x velocity
+    ryvel   = ('ryvel', True),      # raw y velocity
+    fgxvel  = ('fgxvel', True),     # fast gaze x velocity
+    fgyvel  = ('fgyvel', True),     # fast gaze y velocity
+    fhxvel  = ('fhxvel', True),     # fast headref x velocity
+    fhyvel  = ('fhyvel', True),     # fast headref y velocity
+    frxvel  = ('frxvel', True),     # fast raw x velocity
+    fryvel  = ('fryvel', True),     # fast raw y velocity
+    flags   = ('flags', False),     # flags to indicate contents
+    input   = ('input', False),     # extra (input word)
+    buttons = ('buttons', False),   # button state & changes
+    htype   = ('htype', False),     # head-tracker data type
+    errors  = ('errors', False)     # process error flags
+
+)
+
+## Default channels read from FSAMPLE.
+default_fields = ('gx', 'gy', 'pupil')
+
+## Value of missing float sample data in EDF files (written as '.' in ASC files).
+missing_data = 1e8
+
+## Record dtype of messages (variable-length strings).
+message_dtype = [('sample', int), ('message', object)]
@@ -1,6 +1,5 @@
 import sys
 import os.path as op
-import urllib.request
 from ctypes import (c_int, Structure, c_char, c_char_p, c_ubyte,
                     c_short, c_ushort, c_uint, c_float, POINTER, CDLL)
 EDF_DIR = op.dirname( op.realpath(__file__) )
@@ -25,6 +24,7 @@ if sys.platform.startswith('linux'):
 
     ## If not present, retrieve from Github.
     if not op.isfile(fname):
+        import urllib.request
         url = 'https://github.com/nivlab/NivLink/raw/master/nivlink/edf/edfapi/linux/libedfapi.so.masked'
         urllib.request.urlretrieve(url, fname)
 
@@ -35,6 +35,7 @@ elif sys.platform.startswith('darwin'):
 
     ## If not present, retrieve from Github.
     if not op.isfile(fname):
+        import urllib.request
         url = 'https://github.com/nivlab/NivLink/raw/master/nivlink/edf/edfapi/macosx/edfapi'
         urllib.request.urlretrieve(url, fname)
 
@@ -354,3 +355,22 @@ edf_get_event_data = edfapi.edf_get_event_data
 edf_get_event_data.__doc__ = doc
 edf_get_event_data.argtypes = [POINTER(EDFFILE)]
 edf_get_event_data.restype = POINTER(FEVENT)
+
+
+doc = """Returns the number of elements (samples, events, messages, recordings)
+in the EDF file.
+
+Parameters
+----------
+EDFFILE : pointer
+    A valid pointer to EDFFILE structure created by calling `edf_open_file`.
+
+Returns
+-------
+count : int
+    Number of elements in the EDF file.
+"""
+edf_get_element_count = edfapi.edf_get_element_count
+edf_get_element_count.__doc__ = doc
+edf_get_element_count.argtypes = [POINTER(EDFFILE)]
+edf_get_element_count.restype = c_uint
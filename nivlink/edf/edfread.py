@@ -1,13 +1,136 @@
 import os
-from numpy import array, expand_dims, float64, unicode_, searchsorted
-from datetime import datetime
-from ctypes import byref, c_int, create_string_buffer, string_at
+from numpy import (array, asarray, ceil, concatenate, diff, dtype, empty, flatnonzero,
+                   float64, maximum, minimum, reshape, searchsorted, where)
+from ctypes import byref, c_int, create_string_buffer, memmove, string_at
 from .edfapi import (edf_open_file, edf_close_file, edf_get_next_data,
                     edf_get_preamble_text_length, edf_get_preamble_text,
-                    edf_get_recording_data, edf_get_sample_data, edf_get_event_data)
-from .constants import event_codes
+                    edf_get_recording_data, edf_get_sample_data, edf_get_event_data,
+                    edf_get_element_count, FSAMPLE)
+from .constants import event_codes, sample_fields, default_fields, message_dtype
+from .utils import parse_preamble, align_events, check_dtype, convert_samples
 error_code = byref(c_int(1))
 
+## NumPy structured dtype mirroring the FSAMPLE struct.
+fsample_dtype = dtype(FSAMPLE)
+
+def edf_sample_dtype(ch_names):
+    """Return the structured dtype of the FSAMPLE prefix holding the requested channels.
+    
+    Parameters
+    ----------
+    ch_names : list
+        Channels to extract from FSAMPLE (see `constants.sample_fields`).
+        
+    Returns
+    -------
+    dtype : np.dtype
+        Structured dtype with the same field offsets as FSAMPLE, whose itemsize
+        spans only the leading bytes of FSAMPLE up to the last requested field.
+    """
+    
+    ## Error-catching.
+    invalid = [ch for ch in ch_names if ch not in sample_fields]
+    if invalid: raise ValueError('Channels not recognized: %s' %', '.join(invalid))
+    
+    ## Collect FSAMPLE fields.
+    names = ['time'] + [sample_fields[ch][0] for ch in ch_names]
+    names = sorted(set(names), key=lambda name: fsample_dtype.fields[name][1])
+    formats = [fsample_dtype.fields[name][0] for name in names]
+    offsets = [fsample_dtype.fields[name][1] for name in names]
+    
+    ## Round itemsize up to FSAMPLE alignment.
+    itemsize = max([o + f.itemsize for o, f in zip(offsets, formats)])
+    itemsize = min(-(-itemsize // fsample_dtype.alignment) * fsample_dtype.alignment, 
+                   fsample_dtype.itemsize)
+    
+    return dtype(dict(names=names, formats=formats, offsets=offsets, itemsize=itemsize))
+
+class _SampleBuffer(object):
+    """Growable record array for collecting samples.
+    
+    The bytes of each FSAMPLE are copied with `memmove` into the next record
+    of a preallocated structured array, so no Python objects are created per
+    sample. When the array is full, its capacity is doubled.
+    
+    Parameters
+    ----------
+    dtype : np.dtype
+        Record dtype, as returned by `edf_sample_dtype`.
+    size : int
+        Initial number of records to preallocate.
+    """
+    
+    def __init__(self, dtype, size=4096):
+        self.data = empty(max(int(size), 1), dtype=dtype)
+        self.address = self.data.ctypes.data
+        self.itemsize = dtype.itemsize
+        self.n = 0
+        
+    def append(self, sample):
+        """Copy one sample from an FSAMPLE pointer."""
+        if self.n == self.data.shape[0]: self._grow()
+        memmove(self.address + self.n * self.itemsize, sample, self.itemsize)
+        self.n += 1
+        
+    def _grow(self):
+        """Double capacity. Note: np.concatenate would repack the record layout."""
+        data = empty(2 * self.n, dtype=self.data.dtype)
+        data[:self.n] = self.data
+        self.data = data
+        self.address = self.data.ctypes.data
+        
+    def flush(self):
+        """Return filled records and reset. Records are overwritten by later samples."""
+        data = self.data[:self.n]
+        self.n = 0
+        return data
+        
+    def finalize(self):
+        """Return filled records. Copies only if much of the array is unused."""
+        data = self.data[:self.n]
+        if self.n < 0.75 * self.data.shape[0]: data = data.copy()
+        self.data = None
+        return data
+
+def edf_format_samples(samples, ch_names, eye, dtype=float64):
+    """Gather channels from sample records.
+    
+    Parameters
+    ----------
+    samples : array, shape (n,)
+        Sample records, as collected by `_SampleBuffer`.
+    ch_names : list
+        Channels to extract.
+    eye : 'LEFT' | 'RIGHT' | 'BOTH'
+        Recorded eye(s).
+    dtype : dtype
+        Data type of samples (see `utils.convert_samples`).
+        
+    Returns
+    -------
+    times : array, shape (n,)
+        Sample timestamps.
+    data : array, shape (n, n_eyes, n_channels)
+        Recording samples.
+    eye_names : tuple
+        Order of data channels (by eye).
+    """
+    
+    ## Define eyes.
+    if eye == 'LEFT': eye_ix, eye_names = slice(0, 1), ('LEFT',)
+    elif eye == 'RIGHT': eye_ix, eye_names = slice(1, 2), ('RIGHT',)
+    else: eye_ix, eye_names = slice(0, 2), ('LEFT', 'RIGHT')
+    
+    ## Gather channels (strided views of the records).
+    n_eyes = eye_ix.stop - eye_ix.start
+    data = empty((samples.shape[0], n_eyes, len(ch_names)), dtype=check_dtype(dtype))
+    for i, ch in enumerate(ch_names):
+        attr, binocular = sample_fields[ch]
+        if binocular: data[...,i] = convert_samples(samples[attr][:,eye_ix], dtype)
+        else: data[...,i] = convert_samples(samples[attr][:,None], dtype)
+        
+    return samples['time'].astype(int), data, eye_names
+
 def edf_parse_preamble(EDFFILE):
     """Parse EDF preamble for dictionary lookup."""
     
@@ -18,30 +141,7 @@ def edf_parse_preamble(EDFFILE):
     ## Extract preamble text.
     edf_get_preamble_text(EDFFILE, preamble, n + 1)
     
-    ## Preprocess preamble text.
-    preamble = preamble.value.decode('ASCII').split('\n')
-    preamble = [s.replace('**','').strip() for s in preamble]
-    preamble = [s for s in preamble if s]
-    
-    ## Store in dictionary.
-    info = {}
-    for line in preamble:
-        k, v = line[:line.find(':')], line[line.find(':')+1:].strip()
-        if 'DATE' in k: 
-            fmt = '%a %b %d %H:%M:%S %Y'
-            info['meas_date'] = datetime.strptime(v, fmt)
-        elif 'CAMERA' in k:
-            info['camera'] = v
-        elif 'VERSION' in k:
-            info['version'] = v
-        
-    return info
-
-def edf_parse_sample(EDFFILE):
-    """Return sample info: time, eye fixation, pupil size (left/right)."""    
-    sample = edf_get_sample_data(EDFFILE).contents    
-    return (sample.time, sample.gx[0], sample.gx[1], sample.gy[0], sample.gy[1],
-            sample.pa[0], sample.pa[1])
+    return parse_preamble(preamble.value.decode('ASCII'))
 
 def edf_parse_blink(EDFFILE):
     """Return blink info: start, end."""
@@ -70,13 +170,21 @@ def edf_parse_recording(EDFFILE, info):
         info['pupil'] = {0:'AREA', 1:'DIAMETER'}.get(recording.pupil_type,'NA')
     return info
         
-def edf_read(fname):
+def edf_read(fname, fields=None, dtype=float64):
     """Read and parse EDF file.
     
     Parameters
     ----------
     fname : str
         Path to EDF file.
+    fields : list | None
+        Sample channels to read (e.g. 'gx', 'gy', 'pupil', 'gxvel', 'flags').
+        See `constants.sample_fields` for all options. Defaults to
+        ('gx', 'gy', 'pupil').
+    dtype : dtype
+        Data type of samples: float32, float64 or a signed integer type. 
+        Integer samples are rounded, and missing samples are set to the 
+        minimum of the type (see `utils.convert_samples`).
         
     Returns
     -------
@@ -84,25 +192,35 @@ def edf_read(fname):
         EDF file metadata.
     times : array, shape (n,)
         Time of recording samples (in seconds).
-    data : array, shape (n, 3)
-        Recording samples comprised of gaze_x, gaze_y, pupil.
+    data : array, shape (n, n_eyes, n_channels)
+        Recording samples of the requested channels.
     blinks : array, shape (i, 2)
         Detected blinks detailed by their start and end.
     saccades : array, shape (j, 2)
         Detected saccades detailed by their start and end.
     messages : array, shape (k, 2)
         Detected messages detailed by their time and message.
+    ch_names : tuple
+        Names of data channels.
+    eye_names : tuple
+        Order of data channels (by eye).
     """
     
+    ## Define channels.
+    ch_names = default_fields if fields is None else tuple(fields)
+    sample_dtype = edf_sample_dtype(ch_names)
+    
     ## Define EDF filepath.
     fname = os.path.normpath(os.path.abspath(fname).encode("ASCII"))
     if not os.path.isfile(fname): raise IOError('File not found.')
         
-    ## Preallocate space.
-    samples, blinks, saccades, messages = [], [], [], []
-    
     ## Open EDFFILE.
     EDFFILE = edf_open_file(fname, 1, 1, 1, error_code)
+    
+    ## Preallocate space. The element count (samples + events) is an
+    ## upper bound on the number of samples.
+    samples = _SampleBuffer(sample_dtype, edf_get_element_count(EDFFILE))
+    blinks, saccades, messages = [], [], []
 
     ## Parse preamble (initialize info.)
     info = edf_parse_preamble(EDFFILE)
@@ -120,7 +238,7 @@ def edf_read(fname):
             raise ValueError('Code %s not recognized.' %code)
         
         elif code == 'SAMPLES':
-            samples.append( edf_parse_sample(EDFFILE) )
+            samples.append( edf_get_sample_data(EDFFILE) )
             
         elif code == 'ENDBLINK':
             blinks.append( edf_parse_blink(EDFFILE) )
@@ -138,36 +256,200 @@ def edf_read(fname):
     edf_close_file(EDFFILE);
     
     ## Extract data.    
-    samples = array(samples, dtype=float64)
-    if info['eye'] == 'LEFT': 
-        data = expand_dims(samples[:,1::2], 1)
-        eye_names = ('LEFT')
-    elif info['eye'] == 'RIGHT': 
-        data = expand_dims(samples[:,2::2], 1)
-        eye_names = ('RIGHT')
-    else: 
-        data = samples[:,1:].reshape(-1, 2, 3, order='F')
-        eye_names = ('LEFT', 'RIGHT')
-    
-    ## Format time.
-    times = samples[:,0].astype(int)
-    start_time = int(times[0])
-    times -= start_time  
-    
-    ## Format blinks.
-    blinks = array(blinks, dtype=int) - start_time
-    blinks = searchsorted(times, blinks)
-    
-    ## Format saccades.
-    saccades = array(saccades, dtype=int) - start_time
-    saccades = searchsorted(times, saccades)
-    
-    ## Format messages.
-    messages = array(messages, dtype=[('sample',int),('message',unicode_, 80)])        
-    messages['sample'] = messages['sample'] - start_time
-    messages['sample'] = searchsorted(times, messages['sample'])
-    
-    ## Define channel names.
-    ch_names = ('gx','gy','pupil')
-    
-    return info, data, blinks, saccades, messages, ch_names, eye_names
\ No newline at end of file
+    samples = samples.finalize()
+    times, data, eye_names = edf_format_samples(samples, ch_names, info['eye'], dtype)
+    del samples
+    
+    ## Convert event times to samples.
+    blinks, saccades, messages = align_events(times, blinks, saccades, messages)
+    
+    return info, data, blinks, saccades, messages, ch_names, eye_names
+
+class _TimeIndex(object):
+    """Compact index of sample times read so far.
+    
+    Times are stored as runs of evenly spaced samples, each detailed by its
+    start time, sample index, step and length (typically one run per 
+    block, or per recording within a block).
+    """
+    
+    def __init__(self):
+        self.runs, self.n_samples, self._table = [], 0, None
+        
+    def extend(self, times):
+        """Append times of block of samples."""
+        times = asarray(times, dtype=float64)
+        if not times.size: return
+        
+        ## Runs start where the step between samples changes.
+        steps = diff(times)
+        starts = concatenate([[0], flatnonzero(steps[1:] != steps[:-1]) + 2])
+        starts = starts[starts < times.size]
+        lengths = diff(concatenate([starts, [times.size]]))
+        run_steps = where(lengths > 1, times[minimum(starts + 1, times.size - 1)] - times[starts], 1)
+        
+        self.runs.append(array([times[starts], starts + self.n_samples, run_steps, lengths], 
+                               dtype=float64).T)
+        self.n_samples += times.size
+        self._table = None
+        
+    def searchsorted(self, t):
+        """Return index of first sample at or after each time."""
+        if self._table is None: self._table = concatenate(self.runs)
+        times, index, steps, lengths = self._table.T
+        t = asarray(t, dtype=float64)
+        
+        ## Find run starting at or before each time, then position within run.
+        k = searchsorted(times, t, side='right') - 1
+        kk = maximum(k, 0)
+        pos = ceil((t - times[kk]) / steps[kk])
+        ix = index[kk] + where(pos < lengths[kk], pos, lengths[kk])
+        return where(k < 0, 0, ix).astype(int)
+
+def _edf_block(block, index, blinks, saccades, messages, final=False):
+    """Assemble block of samples with the events ending in it.
+    
+    Parameters
+    ----------
+    block : tuple
+        Block of samples, detailed by (start, data).
+    index : _TimeIndex
+        Index of times of all samples read so far.
+    blinks, saccades, messages : list
+        Pending events (by time). Assembled events are removed in place.
+    final : bool
+        If True, assemble all pending events.
+    """
+    
+    ## Convert event times to samples.
+    start, data = block
+    stop = start + data.shape[0]
+    b = index.searchsorted(reshape(array(blinks, dtype=float64), (-1, 2)))
+    s = index.searchsorted(reshape(array(saccades, dtype=float64), (-1, 2)))
+    m = array(messages, dtype=message_dtype)
+    m['sample'] = index.searchsorted([t for t, _ in messages])
+    
+    ## Identify events ending within the block (or earlier, if reported late).
+    ix = [final | (arr < stop) for arr in (b[:,1], s[:,1], m['sample'])]
+    for events, keep in zip((blinks, saccades, messages), ix):
+        events[:] = [event for event, done in zip(events, keep) if not done]
+        
+    return start, data, b[ix[0]], s[ix[1]], m[ix[2]]
+
+def iter_edf(fname, n_samples, fields=None, dtype=float64):
+    """Iterate over EDF file in blocks of samples.
+    
+    Parameters
+    ----------
+    fname : str
+        Path to EDF file.
+    n_samples : int
+        Number of samples per block. The last block may be shorter.
+    fields : list | None
+        Sample channels to read. See `edf_read`.
+    dtype : dtype
+        Data type of samples. See `edf_read`.
+        
+    Yields
+    ------
+    start : int
+        Sample index of the first sample in the block.
+    data : array, shape (n_samples, n_eyes, n_channels)
+        Recording samples of the requested channels.
+    blinks : array, shape (i, 2)
+        Blinks ending in the block (or reported late, see Notes), detailed by 
+        their start and end.
+    saccades : array, shape (j, 2)
+        Saccades ending in the block (or reported late), detailed by their 
+        start and end.
+    messages : array, shape (k, 2)
+        Messages occurring in the block (or reported late), detailed by their 
+        sample and message.
+        
+    Notes
+    -----
+    All sample indices are relative to the start of the recording, and are
+    identical to those returned by `edf_read`. Each block is yielded once
+    the following block has been read, so that events reported late by the
+    EyeLink parser are assigned to the block they end in, as long as blocks 
+    are longer than the reporting lag (typically a few samples). Events 
+    reported after their block was yielded are assigned to the next block 
+    yielded (never an earlier one); the concatenation of all blocks always 
+    matches `edf_read`. Only two blocks of
+    samples are kept in memory at a time, along with a compact index of 
+    the times of all samples read (see `_TimeIndex`), so that events
+    starting many blocks earlier are assigned their correct onsets.
+    """
+    
+    ## Define channels.
+    ch_names = default_fields if fields is None else tuple(fields)
+    sample_dtype = edf_sample_dtype(ch_names)
+    
+    ## Define EDF filepath.
+    fname = os.path.normpath(os.path.abspath(fname).encode("ASCII"))
+    if not os.path.isfile(fname): raise IOError('File not found.')
+        
+    ## Open EDFFILE.
+    EDFFILE = edf_open_file(fname, 1, 1, 1, error_code)
+    
+    ## Preallocate space.
+    samples = _SampleBuffer(sample_dtype, n_samples)
+    blinks, saccades, messages = [], [], []
+    blocks, index, start = [], _TimeIndex(), 0
+    
+    ## Parse preamble (initialize info.)
+    info = edf_parse_preamble(EDFFILE)
+    
+    try:
+        
+        ## Main loop.
+        event = True
+        while event:
+            
+            ## Get next event.
+            event = edf_get_next_data(EDFFILE)
+            code = event_codes.get(event, 'NA')
+            
+            if code == 'NA':
+                raise ValueError('Code %s not recognized.' %code)
+            
+            elif code == 'SAMPLES':
+                samples.append( edf_get_sample_data(EDFFILE) )
+                if samples.n < n_samples: continue
+                
+                ## Store block. Yield previous block.
+                times, data, _ = edf_format_samples(samples.flush(), ch_names, info['eye'], dtype)
+                blocks.append((start, data))
+                index.extend(times)
+                start += times.size
+                if len(blocks) > 1: 
+                    yield _edf_block(blocks.pop(0), index, blinks, saccades, messages)
+                
+            elif code == 'ENDBLINK':
+                blinks.append( edf_parse_blink(EDFFILE) )
+                
+            elif code == 'ENDSACC':
+                saccades.append( edf_parse_blink(EDFFILE) )
+                
+            elif code == 'MESSAGEEVENT':
+                messages.append( edf_parse_message(EDFFILE) )
+                
+            elif code == 'RECORDING':
+                info = edf_parse_recording(EDFFILE, info)
+                
+        ## Store last (partial) block.
+        if samples.n:
+            times, data, _ = edf_format_samples(samples.flush(), ch_names, info['eye'], dtype)
+            blocks.append((start, data))
+            index.extend(times)
+            if len(blocks) > 1: 
+                yield _edf_block(blocks.pop(0), index, blinks, saccades, messages)
+                
+        ## Yield last block.
+        if blocks: 
+            yield _edf_block(blocks.pop(0), index, blinks, saccades, messages, final=True)
+            
+    finally:
+        
+        ## Close EDFFILE.
+        edf_close_file(EDFFILE);
@@ -0,0 +1,121 @@
+"""Parsing utilities shared by the EDF and ASC readers."""
+
+from datetime import datetime
+from numpy import (array, searchsorted, dtype as as_dtype, iinfo, isfinite, 
+                   logical_and, rint, where, float64)
+from .constants import message_dtype, missing_data
+
+def parse_preamble(text):
+    """Parse preamble text for dictionary lookup."""
+
+    ## Preprocess preamble text.
+    preamble = text.split('\n')
+    preamble = [s.replace('**','').strip() for s in preamble]
+    preamble = [s for s in preamble if s]
+
+    ## Store in dictionary.
+    info = {}
+    for line in preamble:
+        k, v = line[:line.find(':')], line[line.find(':')+1:].strip()
+        if 'DATE' in k:
+            fmt = '%a %b %d %H:%M:%S %Y'
+            info['meas_date'] = datetime.strptime(v, fmt)
+        elif 'CAMERA' in k:
+            info['camera'] = v
+        elif 'VERSION' in k:
+            info['version'] = v
+
+    return info
+
+def align_events(times, blinks, saccades, messages, offset=0):
+    """Convert event times to sample indices.
+
+    Parameters
+    ----------
+    times : array, shape (n,)
+        Timestamps of recording samples.
+    blinks : list
+        Blinks detailed by their start and end time.
+    saccades : list
+        Saccades detailed by their start and end time.
+    messages : list
+        Messages detailed by their time and message.
+    offset : int
+        Sample index of the first timestamp in `times`.
+
+    Returns
+    -------
+    blinks : array, shape (i, 2)
+        Blinks detailed by their start and end sample.
+    saccades : array, shape (j, 2)
+        Saccades detailed by their start and end sample.
+    messages : array, shape (k, 2)
+        Messages detailed by their sample and message.
+    """
+
+    ## Format time.
+    start_time = times[0]
+    times = times - start_time
+
+    ## Format blinks.
+    blinks = array(blinks, dtype=times.dtype) - start_time
+    blinks = searchsorted(times, blinks) + offset
+
+    ## Format saccades.
+    saccades = array(saccades, dtype=times.dtype) - start_time
+    saccades = searchsorted(times, saccades) + offset
+
+    ## Format messages.
+    message_times = array([t for t, _ in messages], dtype=times.dtype) - start_time
+    messages = array(messages, dtype=message_dtype)
+    messages['sample'] = searchsorted(times, message_times) + offset
+
+    return blinks, saccades, messages
+
+def check_dtype(dtype):
+    """Return dtype of samples, which must be float32, float64 or a signed integer."""
+    dtype = as_dtype(dtype)
+    if (dtype.kind == 'f' and dtype.itemsize >= 4) or dtype.kind == 'i': return dtype
+    raise ValueError('dtype must be float32, float64 or a signed integer type (e.g. int16).')
+
+def missing_value(dtype):
+    """Return value marking missing samples in data of given dtype.
+
+    Float data keep the value used in EDF files (1e8). Integer data, which
+    cannot hold it, use the minimum of the integer type (e.g. -32768).
+    """
+    dtype = check_dtype(dtype)
+    return iinfo(dtype).min if dtype.kind == 'i' else missing_data
+
+def convert_samples(samples, dtype):
+    """Convert samples to dtype.
+
+    Parameters
+    ----------
+    samples : array
+        Recording samples.
+    dtype : dtype
+        Target type (see `check_dtype`).
+
+    Returns
+    -------
+    samples : array
+        Converted samples. For integer types, values are rounded to the
+        nearest integer, and missing values (1e8, NaN, or values outside of
+        the range of the type) are set to `missing_value(dtype)`.
+    """
+    dtype = check_dtype(dtype)
+
+    ## Integer samples: carry over missing values.
+    if samples.dtype.kind == 'i':
+        missing = samples == iinfo(samples.dtype).min
+        samples = samples.astype(float64 if dtype.kind == 'i' else dtype)
+        samples[missing] = missing_data
+    if dtype.kind == 'f': return samples.astype(dtype, copy=False)
+
+    ## Round and mark missing values.
+    info = iinfo(dtype)
+    samples = rint(samples)
+    valid = logical_and(isfinite(samples), samples != missing_data)
+    valid &= logical_and(samples > info.min, samples <= info.max)
+    return where(valid, samples, info.min).astype(dtype)
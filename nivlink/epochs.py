@@ -1,5 +1,91 @@
 import numpy as np
 from copy import deepcopy
+from .artifacts import IntervalIndex
+
+def _gather_epochs(data, raw_ix, epoch_ix, n_times, eye_ix, ch_ix, dtype=None, block_size=2**22):
+    """Gather epochs from raw data.
+    
+    Parameters
+    ----------
+    data : array, shape (n_samples, n_eyes, n_channels)
+        Raw recording samples (or `ChunkedArray`).
+    raw_ix : array, shape (n_trials, 2)
+        Onset and offset of trials in raw samples.
+    epoch_ix : array, shape (n_trials, 2)
+        Onset and offset of trials in epoch samples.
+    n_times : int
+        Number of samples per epoch.
+    eye_ix, ch_ix : array
+        Indices of eyes and channels to gather.
+    dtype : dtype | None
+        Data type of epochs (if None, the type of `data`).
+    block_size : int
+        Maximum number of samples (or gather indices) held in memory at 
+        once, before conversion to dtype (or for trials extending past the
+        recording, or data in chunked storage).
+        
+    Returns
+    -------
+    epochs : array, shape (n_trials, n_eyes, n_channels, n_times)
+        Epoched data. Samples outside of a trial's extent, or outside of
+        the recording, are NaN (or, for integer types, the minimum of the 
+        type).
+    """
+    from numpy.lib.stride_tricks import sliding_window_view
+    from .edf.utils import convert_samples
+    n_trials, n_samples = raw_ix.shape[0], data.shape[0]
+    dtype = data.dtype if dtype is None else np.dtype(dtype)
+    convert = (lambda arr: arr) if dtype == data.dtype else (lambda arr: convert_samples(arr, dtype))
+    epochs = np.empty((n_trials, eye_ix.size, ch_ix.size, n_times), dtype=dtype)
+    step = max(1, block_size // max(n_times * eye_ix.size * ch_ix.size, 1))
+    
+    ## Define raw sample of first epoch sample, and valid epoch samples per trial.
+    start = raw_ix[:,0] - epoch_ix[:,0]
+    lower = np.maximum(epoch_ix[:,0], -start)
+    upper = np.minimum(epoch_ix[:,1], n_samples - start)
+    
+    ## Trials within recording: gather windows of a strided view of the data 
+    ## (shape (n_samples - n_times + 1, n_eyes, n_channels, n_times)), which
+    ## writes epochs directly in (trial, eye, channel, time) layout. Blocks of
+    ## trials are converted to dtype before being written.
+    inside = np.logical_and(start >= 0, start + n_times <= n_samples)
+    if hasattr(data, 'oindex') or not n_times: inside[:] = False
+    if inside.any():
+        windows = sliding_window_view(np.asarray(data), n_times, axis=0)
+        if inside.all() and dtype == data.dtype: 
+            epochs = windows[np.ix_(start, eye_ix, ch_ix)]
+        else:
+            trials = np.flatnonzero(inside)
+            for block in np.array_split(trials, np.arange(step, trials.size, step)):
+                epochs[block] = convert(windows[np.ix_(start[block], eye_ix, ch_ix)])
+    
+    ## Other trials: gather clipped sample indices per eye and channel.
+    rest = np.flatnonzero(~inside)
+    step = max(1, block_size // max(n_times, 1))
+    for trials in np.array_split(rest, np.arange(step, rest.size, step)):
+        if not trials.size or not n_samples: continue
+        index = np.clip(start[trials,np.newaxis] + np.arange(n_times), 0, n_samples - 1)
+        
+        ## Chunked storage: read only samples needed, then gather from them.
+        source, eyes, channels = data, eye_ix, ch_ix
+        if hasattr(data, 'oindex'):
+            samples = np.unique(index)
+            source = data.oindex[samples, eye_ix, ch_ix]
+            index = np.searchsorted(samples, index)
+            eyes, channels = np.arange(eye_ix.size), np.arange(ch_ix.size)
+            
+        for i, e in enumerate(eyes):
+            for j, c in enumerate(channels):
+                epochs[trials,i,j] = convert(np.take(source[:,e,c], index))
+    
+    ## Mask samples outside of trials or recording.
+    fill = np.iinfo(epochs.dtype).min if epochs.dtype.kind == 'i' else np.nan
+    if n_trials:
+        offsets = np.arange(n_times)
+        invalid = np.logical_or(offsets < lower[:,np.newaxis], offsets >= upper[:,np.newaxis])
+        np.copyto(epochs, fill, where=invalid[:,np.newaxis,np.newaxis])
+        
+    return epochs
 
 class Epochs(object):
     """Epochs extracted from a Raw instance.
@@ -16,21 +102,33 @@ class Epochs(object):
     tmax : float | array
         End time after event. If float, all events start at same
         time relative to event onset.
-    picks : 'gaze' | 'pupil' | None
-        Data types to include (if None, all data are used).
+    picks : 'gaze' | 'pupil' | list | None
+        Data types to include (if None, all data are used). A list
+        selects channels by name (e.g. ['gx', 'gxvel']).
     eyes : 'LEFT' | 'RIGHT' | None
         Eye recordings to include (if None, all data are used).
     blinks : True | False
         Include blinks and re-reference to epochs.
     saccades : True | False
         Include saccades and re-ference to epochs.
+    preload : True | False
+        If True, extract all epochs on initialization. If False, keep only 
+        a reference to `raw` and the index of each epoch, and extract epochs
+        on demand (see `get_data`). Memory then scales with the recording 
+        rather than with the number of (possibly overlapping) epochs.
+    dtype : dtype | None
+        Data type of epochs: float32, float64 or a signed integer type. If
+        None, the type of the raw data. Samples outside of a trial are NaN 
+        (or, for integer types, the minimum of the type, e.g. -32768).
         
     Attributes
     ----------
     info : dict
         Recording metadata.
     data : array, shape (n_trials, n_eyes, n_channels, n_times)
-        Recording samples.    
+        Recording samples. Samples outside of a trial (for variable-length
+        epochs) or outside of the recording are NaN. If not preloaded, 
+        epochs are extracted on each access.
     times : array, shape (n_times,)
         Time vector in seconds. Goes from `tmin` to `tmax`. Time interval
         between consecutive time samples is equal to the inverse of the
@@ -42,23 +140,27 @@ class Epochs(object):
     eye_names : list, shape (n_eyes)
         Order of data channels (by eye).
     blinks : array, shape (i, 3)
-        (If included) Detected blinks detailed by their trial, start, and end.
+        (If included) Detected blinks detailed by their trial, start, and end
+        (as indices of `times`, clipped to the extent of the trial).
     saccades : array, shape (j, 3)
-        (If included) Detected saccades detailed by their trial, start, and end.
+        (If included) Detected saccades detailed by their trial, start, and end
+        (as indices of `times`, clipped to the extent of the trial).
     """
     
     def __init__(self, raw, events, tmin=0, tmax=1, picks=None, eyes=None, 
-                 blinks=True, saccades=True):
+                 blinks=True, saccades=True, preload=True, dtype=None):
         
         ## Define metadata.
         self.info = deepcopy(raw.info)
 
         ## Define channels.
-        if picks is None: ch_names = ('gx','gy','pupil')
+        if picks is None: ch_names = raw.ch_names
+        elif not isinstance(picks, str): ch_names = tuple(picks)
+        elif picks in raw.ch_names: ch_names = (picks,)
         elif picks.lower().startswith('g'): ch_names = ('gx','gy')
-        elif picks.lower().startswith('p'): ch_names = ('pupil')
+        elif picks.lower().startswith('p'): ch_names = ('pupil',)
         else: raise ValueError(f'"{picks}" not valid input for picks.')
-        self.ch_names = tuple(np.intersect1d(ch_names, raw.ch_names))
+        self.ch_names = tuple(ch for ch in raw.ch_names if ch in ch_names)
         ch_ix = np.in1d(raw.ch_names,self.ch_names)
 
         ## Define eyes.
@@ -94,25 +196,24 @@ class Epochs(object):
         epoch_ix[:,-1] += np.squeeze(np.diff(raw_ix) - np.diff(epoch_ix))
         self._ix = epoch_ix.astype(int)
         
-        ## Make epochs.
-        self.data = np.ones((events.shape[0], self.times.size, len(self.eye_names), len(self.ch_names))) * np.nan
-        index = np.column_stack((raw_ix, epoch_ix))
-        for i, (r1, r2, e1, e2) in enumerate(index):
-            # TODO: This ugly syntax should be replaced in time (numpy issues 13255)
-            self.data[i,e1:e2,...] = deepcopy(raw.data[r1:r2,eye_ix][...,ch_ix])
-        self.data = np.moveaxis(self.data,1,-1)
+        ## Make epochs (or store index for extracting epochs on demand).
+        self._raw_ix = raw_ix
+        self._eye_ix, self._ch_ix = np.flatnonzero(eye_ix), np.flatnonzero(ch_ix)
+        self._raw, self._data, self.preload = raw, None, bool(preload)
+        self._dtype = raw.data.dtype if dtype is None else np.dtype(dtype)
+        if preload: self._data, self._raw = self.get_data(), None
                         
         ## Re-reference artifacts to epochs.
-        if blinks: self.blinks = self._align_artifacts(raw.blinks, raw_ix)
-        if saccades: self.saccades = self._align_artifacts(raw.saccades, raw_ix)
+        if blinks: self.blinks = self._align_artifacts(raw.get_intervals('blinks'), raw_ix)
+        if saccades: self.saccades = self._align_artifacts(raw.get_intervals('saccades'), raw_ix)
         
     def _align_artifacts(self, artifacts, raw_ix):
         """Re-aligns artifacts (blinks, saccades) from raw to epochs times.
         
         Parameters
         ----------
-        artifacts : array, shape=(n_artifacts, 2)
-            Blinks or saccades index array from Raw object.
+        artifacts : array, shape=(n_artifacts, 2) | IntervalIndex
+            Blinks or saccades index array (or interval index) from Raw object.
         raw_ix : array, shape=(n_events, 2)
             Events index array computed in Epoching.
             
@@ -121,31 +222,212 @@ class Epochs(object):
         artifacts : array, shape=(n_artifacts, 3)
             Artifacts (blinks, saccades) overlapping with events. First column 
             denotes event number, second column denotes artifact onset, and
-            third column denotes artifact offset.
+            third column denotes artifact offset (in epoch samples, i.e. 
+            indices of `times`, clipped to the extent of the trial).
         """
             
-        ## Broadcast trial onsets/offsets to number of blinks.
-        n_events, _, _, n_times = self.data.shape
-        onsets  = np.broadcast_to(raw_ix[:,0], (artifacts.shape[0], n_events)).T
-        offsets = np.broadcast_to(raw_ix[:,1], (artifacts.shape[0], n_events)).T
-
-        ## Identify where blinks overlap with trials.
-        overlap = np.logical_and(onsets < artifacts[:,1], offsets > artifacts[:,0])
-        trials, ix = np.where(overlap)
-
-        ## Assemble blinks data. Realign to epoch times.
-        artifacts = np.column_stack([trials, artifacts[ix]])
-        for i in np.unique(artifacts[:,0]):
-            artifacts[artifacts[:,0]==i,1:] -= int(raw_ix[i,0])
+        n_times = self.times.size
+        
+        ## Find artifacts overlapping trials.
+        if not isinstance(artifacts, IntervalIndex): artifacts = IntervalIndex(artifacts)
+        trials, ix = artifacts.query_many(raw_ix)
+        artifacts = artifacts.intervals
+        
+        ## Assemble artifacts data. Realign to epoch times.
+        onsets = self._ix[trials,:1]
+        artifacts = np.column_stack([trials, artifacts[ix] - raw_ix[trials,:1] + onsets])
             
-        ## Boundary correction.
-        artifacts = np.where(artifacts < 0, 0, artifacts)
-        artifacts = np.where(artifacts > n_times, n_times, artifacts)
+        ## Boundary correction (to trial extents).
+        artifacts[:,1:] = np.clip(artifacts[:,1:], onsets, np.minimum(self._ix[trials,1:], n_times))
         
         return artifacts
     
+    def _artifact_mask(self, kind, pad):
+        """Return boolean mask, shape (n_trials, n_times), of samples during artifacts."""
+        kinds = (kind,) if isinstance(kind, str) else tuple(kind)
+        n_trials, n_times = len(self), self.times.size
+        pad = int(np.rint(pad * self.info['sfreq']))
+        
+        ## Difference array: +1 at artifact onsets, -1 at offsets (flattened by trial).
+        diff = np.zeros(n_trials * (n_times + 1), dtype=np.int32)
+        for kind in kinds:
+            if not hasattr(self, kind): raise ValueError('Epochs do not include %s.' %kind)
+            artifacts = getattr(self, kind)
+            lower = self._ix[artifacts[:,0],0]
+            upper = np.minimum(self._ix[artifacts[:,0],1], n_times)
+            starts = np.clip(artifacts[:,1] - pad, lower, upper)
+            ends = np.clip(artifacts[:,2] + pad, lower, upper)
+            offset = artifacts[:,0] * (n_times + 1)
+            diff += np.bincount(offset + starts, minlength=diff.size).astype(np.int32)
+            diff -= np.bincount(offset + ends, minlength=diff.size).astype(np.int32)
+            
+        ## Running sum is positive within artifacts.
+        diff = diff.reshape(n_trials, n_times + 1)[:,:-1]
+        return np.cumsum(diff, axis=1, out=diff) > 0
+    
+    def mask_artifacts(self, kind=('blinks', 'saccades'), pad=0.0):
+        """Mask samples during artifacts (in place).
+        
+        Parameters
+        ----------
+        kind : 'blinks' | 'saccades' | list
+            Artifacts to mask (must have been included when epoching).
+        pad : float
+            Time (in seconds) to extend each artifact by on either side.
+            
+        Returns
+        -------
+        epochs : instance of `Epochs`
+            Epochs with masked samples set to NaN (or, for integer types, the
+            minimum of the type) in all eyes and channels.
+        """
+        if not self.preload: raise ValueError('Masking artifacts requires preloaded data (preload=True).')
+        mask = self._artifact_mask(kind, pad)
+        fill = np.iinfo(self._data.dtype).min if self._data.dtype.kind == 'i' else np.nan
+        np.copyto(self._data, fill, where=mask[:,np.newaxis,np.newaxis])
+        return self
+    
+    def drop_bad(self, threshold=0.5, kind=('blinks', 'saccades'), pad=0.0):
+        """Drop trials with too many samples during artifacts.
+        
+        Parameters
+        ----------
+        threshold : float
+            Trials in which the fraction of samples during artifacts exceeds
+            this threshold are dropped.
+        kind : 'blinks' | 'saccades' | list
+            Artifacts to consider (must have been included when epoching).
+        pad : float
+            Time (in seconds) to extend each artifact by on either side.
+            
+        Returns
+        -------
+        epochs : instance of `Epochs`
+            Epochs with bad trials dropped. Artifacts are renumbered to the 
+            remaining trials.
+        """
+        
+        ## Identify good trials.
+        mask = self._artifact_mask(kind, pad)
+        lengths = np.maximum(np.minimum(self._ix[:,1], self.times.size) - self._ix[:,0], 1)
+        good = np.flatnonzero(mask.sum(axis=1) / lengths <= threshold)
+        
+        ## Drop trials.
+        if self._data is not None: self._data = self._data[good]
+        self._raw_ix, self._ix, self.extents = self._raw_ix[good], self._ix[good], self.extents[good]
+        renumber = np.full(mask.shape[0], -1)
+        renumber[good] = np.arange(good.size)
+        for kind in ('blinks', 'saccades'):
+            if not hasattr(self, kind): continue
+            artifacts = getattr(self, kind)
+            artifacts = artifacts[renumber[artifacts[:,0]] >= 0]
+            artifacts[:,0] = renumber[artifacts[:,0]]
+            setattr(self, kind, artifacts)
+            
+        return self
+    
+    def apply_baseline(self, baseline=(None, 0), mode='mean', chunk_size=256):
+        """Baseline correct epochs (in place).
+        
+        Parameters
+        ----------
+        baseline : tuple
+            Start and end time (in seconds) of the baseline period, inclusive. 
+            If start (end) is None, the baseline begins (ends) at the start 
+            (end) of the epochs.
+        mode : 'mean' | 'percent' | 'zscore'
+            If 'mean', subtract the baseline mean. If 'percent', express data 
+            as percent change from the baseline mean. If 'zscore', subtract 
+            the baseline mean and divide by the baseline standard deviation. 
+            Baselines are computed per trial, eye and channel, ignoring NaNs.
+        chunk_size : int
+            Number of trials corrected at a time. Memory use beyond the data
+            is proportional to the chunk.
+            
+        Returns
+        -------
+        epochs : instance of `Epochs`
+            Baseline-corrected epochs.
+        """
+        import warnings
+        
+        ## Error-catching.
+        if not self.preload: raise ValueError('Baseline correction requires preloaded data (preload=True).')
+        if self._data.dtype.kind != 'f': raise ValueError('Baseline correction requires float data.')
+        if mode not in ('mean', 'percent', 'zscore'): 
+            raise ValueError('mode must be "mean", "percent" or "zscore".')
+        
+        ## Define baseline period.
+        tmin, tmax = baseline
+        tmin = self.times[0] if tmin is None else tmin
+        tmax = self.times[-1] if tmax is None else tmax
+        ix = np.flatnonzero(np.logical_and(self.times >= tmin, self.times <= tmax))
+        if not ix.size: raise ValueError('Baseline period contains no samples.')
+        ix = slice(ix[0], ix[-1] + 1)
+        
+        ## Correct trials in chunks.
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)   # All-NaN baselines.
+            for start in range(0, len(self), max(int(chunk_size), 1)):
+                data = self._data[start:start+max(int(chunk_size), 1)]
+                mean = np.nanmean(data[...,ix], axis=-1, keepdims=True)
+                np.subtract(data, mean, out=data)
+                if mode == 'percent':
+                    np.divide(data, mean, out=data)
+                    np.multiply(data, 100, out=data)
+                elif mode == 'zscore':
+                    np.divide(data, np.nanstd(data[...,ix], axis=-1, keepdims=True), out=data)
+                
+        return self
+    
+    @property
+    def data(self):
+        if self._data is not None: return self._data
+        return self.get_data()
+    
+    @data.setter
+    def data(self, data):
+        self._data, self._raw, self.preload = data, None, True
+    
+    def get_data(self, trials=None, picks=None):
+        """Return epochs data.
+        
+        Parameters
+        ----------
+        trials : int | slice | array | None
+            Trials to return (if None, all trials are returned).
+        picks : str | list | None
+            Channels to return by name (if None, all channels are returned).
+            
+        Returns
+        -------
+        data : array, shape (n_trials, n_eyes, n_channels, n_times)
+            Recording samples.
+        """
+        
+        ## Define trials and channels.
+        trials = np.arange(self._raw_ix.shape[0]) if trials is None else trials
+        trials = np.atleast_1d(np.arange(self._raw_ix.shape[0])[trials])
+        if picks is None: picks = self.ch_names
+        elif isinstance(picks, str): picks = (picks,)
+        invalid = [ch for ch in picks if ch not in self.ch_names]
+        if invalid: raise ValueError('Channels not in epochs: %s' %', '.join(invalid))
+        ch_ix = np.array([self.ch_names.index(ch) for ch in picks], dtype=int)
+        
+        ## Return epochs.
+        if self._data is not None: return self._data[trials][:,:,ch_ix]
+        return _gather_epochs(self._raw.data, self._raw_ix[trials], self._ix[trials], 
+                              self.times.size, self._eye_ix, self._ch_ix[ch_ix], self._dtype)
+    
+    def __len__(self):
+        return self._raw_ix.shape[0]
+    
+    def __iter__(self):
+        """Iterate over epochs, yielding arrays of shape (n_eyes, n_channels, n_times)."""
+        for i in range(len(self)): yield self.get_data(i)[0]
+    
     def __repr__(self):
-        return '<Epochs | {0} trials, {3} samples>'.format(*self.data.shape)
+        return '<Epochs | {0} trials, {1} samples>'.format(len(self), self.times.size)
     
     def copy(self):
         """Return copy of Raw instance."""
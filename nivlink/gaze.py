@@ -1,10 +1,22 @@
 import numpy as np
-from pandas import DataFrame
-from scipy.ndimage import measurements
 from .raw import Raw
 from .epochs import Epochs    
 
-def align_to_aoi(data, screen, mapping=None):
+def _lookup_aoi(gx, gy, screens, table, xdim, ydim, n_screens, itype):
+    """Look up AoIs of gaze positions in a flattened screen table.
+
+    Positions are mapped to the flat index `(x * ydim + y) * n_screens + screen`
+    of the table, shape (xdim, ydim, n_screens), and positions off screen (or 
+    missing) to no AoI (0)."""
+    valid = (gx >= 0) & (gx < xdim) & (gy >= 0) & (gy < ydim)
+    flat = np.where(valid, gx, 0).astype(itype)
+    flat *= ydim
+    flat += np.where(valid, gy, 0).astype(itype)
+    flat *= n_screens
+    flat += screens
+    return np.where(valid, np.take(table, flat, mode='clip'), table.dtype.type(0))
+
+def align_to_aoi(data, screen, mapping=None, block_size=2**20):
     """Align eyetracking data to areas of interest.
 
     Parameters
@@ -16,42 +28,56 @@ def align_to_aoi(data, screen, mapping=None):
     mapping : array, shape (n_trials,)
         Mapping of trials to screens. If None, all trials mapped to 
         first Screen. Should be zero-indexed.
+    block_size : int
+        Approximate number of samples aligned at once.
 
     Returns
     -------
     aligned : array, shape (n_trials, n_eyes, n_times)
-        Eyetracking timeseries aligned to areas of interest.  
+        Eyetracking timeseries aligned to areas of interest, of the same
+        data type as `screen.indices`. Raw data are treated as a single 
+        trial.
 
     Notes
     -----
     The alignment step makes two critical assumptions during processing:
 
     1. Eyetracking positions are rounded down to the nearest pixel.
-    2. Eyetracking positions outside (xdim, ydim) are set to NaN.
+    2. Eyetracking positions outside (xdim, ydim) are set to 0 (no AoI).
+
+    Neither gaze data nor look-up tables are copied. Blocks of samples are
+    mapped to flat indices into the look-up tables of all screens, and 
+    aligned with a single gather (samples off screen are then set to 0). 
+    Intermediate arrays are int32 (unless the screens exceed 2**31 pixels) 
+    and of block size, so that peak memory is dominated by the output. For screens with the
+    vector backend, blocks are classified with `Screen.classify`.
     """
     
-    if isinstance(data, Raw):
+    if isinstance(data, (Raw, Epochs)):
         
         ## Error-catching: force gx and gy to be present.
         if not np.all(np.in1d(['gx','gy'], data.ch_names)):
             raise ValueError('Both gaze channels (gx, gy) must be present.')
-                        
-        ## Copy data.
-        gaze_ix = np.in1d(data.ch_names, ['gx','gy'])
-        data = data.data[..., gaze_ix].copy()
-        data = np.expand_dims(data, 0)
-        data = data.swapaxes(2,3)
+        gx_ix, gy_ix = [list(data.ch_names).index(ch) for ch in ['gx','gy']]
         
-    if isinstance(data, Epochs):
+    if isinstance(data, Raw):
         
-        ## Error-catching: force gx and gy to be present.
-        if not np.all(np.in1d(['gx','gy'], data.ch_names)):
-            raise ValueError('Both gaze channels (gx, gy) must be present.')
-                        
-        ## Copy data.
-        gaze_ix = np.in1d(data.ch_names, ['gx','gy'])
-        data = data.data[..., gaze_ix, :].copy()
-        data = data.swapaxes(2,3)
+        ## Define views of gaze data, shape (1, n_eyes, n_times).
+        n_trials, n_eyes, n_times = 1, data.data.shape[1], data.data.shape[0]
+        gaze = lambda trials, times: (data.data[times, :, gx_ix].T[np.newaxis],
+                                      data.data[times, :, gy_ix].T[np.newaxis])
+        
+    elif isinstance(data, Epochs):
+        
+        ## Define views of gaze data (gathered blockwise, if not preloaded).
+        n_trials, n_eyes, n_times = len(data), len(data.eye_names), data.times.size
+        if data.preload:
+            gaze = lambda trials, times: (data.data[trials, :, gx_ix, times],
+                                          data.data[trials, :, gy_ix, times])
+        else:
+            def gaze(trials, times):
+                block = data.get_data(trials, picks=['gx','gy'])[...,times]
+                return block[:,:,0], block[:,:,1]
         
     else:
                 
@@ -61,48 +87,49 @@ def align_to_aoi(data, screen, mapping=None):
         elif np.shape(data)[-2] != 2:
             raise ValueError('data must be shape (..., 2, n_trials)')
            
-        ## Copy data.
-        data = np.array(data.copy())
-        data = data.swapaxes(2,3)
+        ## Define views of gaze data.
+        data = np.asarray(data)
+        n_trials, n_eyes, _, n_times = data.shape
+        gaze = lambda trials, times: (data[trials, :, 0, times], data[trials, :, 1, times])
             
-    ## Collect metadata. Preallocate space.
-    n_trials, n_eyes, n_times, n_dim = data.shape
-    xd, yd, n_screens = screen.indices.shape    
-    
-    ## Round gaze data to nearest pixel.
-    data = np.floor(data).astype(int)
-    
-    ## Identify missing data.
-    missing_x = np.logical_or(data[...,0] < 0, data[...,0] >= screen.xdim )
-    missing_y = np.logical_or(data[...,1] < 0, data[...,1] >= screen.ydim )
-    missing = np.logical_or(missing_x, missing_y)
-    
-    ## Mask missing data.
-    data[missing] = 0
-    
-    ## Preallocate space.
-    aligned = np.zeros_like(missing, dtype=int)
-    
     ## Define screen indices.
     if mapping is None: mapping = np.zeros(n_trials, dtype=int)
-    assert np.size(mapping) == n_trials
+    mapping = np.asarray(mapping).ravel()
+    if mapping.size != n_trials:
+        raise ValueError('mapping must be of length n_trials.')
+    if np.any((mapping < 0) | (mapping >= screen.n_screens)):
+        raise ValueError('mapping must be zero-indexed screens.')
     
-    ## Main loop.
-    for ix in np.unique(mapping):
+    if screen.backend == 'vector':
         
-        ## Extract current screen.
-        current_screen = screen.indices[...,ix]
-    
-        ## Define row and column indices.
-        row = data[mapping == ix, :, :, 0].flatten()
-        col = data[mapping == ix, :, :, 1].flatten()
+        ## Classify gaze positions against AoIs of each screen.
+        screen.finalize()
+        dtype = np.min_scalar_type(len(screen.labels))
+        mapping = mapping[:,np.newaxis,np.newaxis]
+        lookup = lambda gx, gy, trials: screen.classify(gx, gy, mapping[trials])
         
-        ## Align data and reshape.
-        t = np.sum(mapping == ix)
-        aligned[mapping == ix] = current_screen[row, col].reshape(t, n_eyes, n_times)
+    else:
     
-    ## Mask missing data.
-    aligned[missing] = 0
+        ## Flatten look-up tables of screens, shape (xdim, ydim, n_screens), 
+        ## without copying.
+        xdim, ydim, n_screens = screen.indices.shape
+        table = screen.indices.reshape(-1)
+        itype = np.int32 if table.size <= np.iinfo(np.int32).max else np.int64
+        screens = mapping.astype(itype)[:,np.newaxis,np.newaxis]
+        dtype = table.dtype
+        lookup = lambda gx, gy, trials: _lookup_aoi(gx, gy, screens[trials], table, 
+                                                    xdim, ydim, n_screens, itype)
+    
+    ## Main loop.
+    aligned = np.zeros((n_trials, n_eyes, n_times), dtype=dtype)
+    n_block = max(1, min(n_trials, block_size // max(n_eyes * n_times, 1)))
+    t_block = max(1, min(n_times, block_size // max(n_block * n_eyes, 1)))
+    for i in range(0, n_trials, n_block):
+        trials = slice(i, i + n_block)
+        for j in range(0, n_times, t_block):
+            times = slice(j, j + t_block)
+            gx, gy = gaze(trials, times)
+            aligned[trials,:,times] = lookup(gx, gy, trials)
     
     return aligned
 
@@ -132,6 +159,8 @@ def compute_fixations(aligned, times, labels=None):
     data, the user can simply pass the aligned object twice (once
     per eye).
     """
+    from pandas import DataFrame
+    from scipy.ndimage import measurements
     
     ## Error-catching.
     assert np.ndim(aligned) == 2
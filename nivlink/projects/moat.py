@@ -148,37 +148,30 @@ def set_screen_moat(info, custom_ctr_left=None, custom_ctr_right=None):
     slope_right = math.sin(math.radians(-45)) / math.cos(math.radians(-45))
     int_left = ctr_left[1] - slope_left * ctr_left[0]
     int_right = ctr_right[1] - slope_right * ctr_right[0]
-    # Create screen sized array with unraveled indices.
-    # This gives us the cartesian coordinate grid in pixel space
-    [X,Y] = np.unravel_index(np.arange(info.xdim * info.ydim),(info.xdim, info.ydim))
-    # Make mask that keeps upper half of large left ellipse.
-    mask1 = np.reshape(slope_left * X + int_left < Y, (info.xdim, info.ydim)).astype(int)
-    # Make mask that keeps lower half of large left ellipse.
-    mask2 = np.reshape(slope_left * X + int_left > Y, (info.xdim, info.ydim)).astype(int)
-    # Make mask that keeps lower half of large right ellipse.
-    mask3 = np.reshape(slope_right * X + int_right > Y, (info.xdim, info.ydim)).astype(int)
-    # Make mask that keeps upper half of large right ellipse.
-    mask4 = np.reshape(slope_right * X + int_right < Y, (info.xdim, info.ydim)).astype(int)
+    # Keep upper (lower) half of large left ellipse.
+    upper_left, lower_left = [(slope_left, int_left, 1)], [(slope_left, int_left, -1)]
+    # Keep upper (lower) half of large right ellipse.
+    upper_right, lower_right = [(slope_right, int_right, 1)], [(slope_right, int_right, -1)]
 
     # Screen 1: whole ellipses
     info.add_ellipsoid_aoi(aois[2,0], aois[2,1], aois[2,2], aois[2,3], aois[2,4], 1)
     info.add_ellipsoid_aoi(aois[3,0], aois[3,1], aois[3,2], aois[3,3], aois[3,4], 1)
 
     # Screen 2: halved left ellipse, whole right ellipse
-    info.add_ellipsoid_aoi(aois[0,0], aois[0,1], aois[0,2], aois[0,3], aois[0,4], 2, mask1)
-    info.add_ellipsoid_aoi(aois[0,0], aois[0,1], aois[0,2], aois[0,3], aois[0,4], 2, mask2)
+    info.add_ellipsoid_aoi(aois[0,0], aois[0,1], aois[0,2], aois[0,3], aois[0,4], 2, halfplanes=upper_left)
+    info.add_ellipsoid_aoi(aois[0,0], aois[0,1], aois[0,2], aois[0,3], aois[0,4], 2, halfplanes=lower_left)
     info.add_ellipsoid_aoi(aois[3,0], aois[3,1], aois[3,2], aois[3,3], aois[3,4], 2)
 
     # Screen 2: whole left ellipse, halved right ellipse
     info.add_ellipsoid_aoi(aois[2,0], aois[2,1], aois[2,2], aois[2,3], aois[2,4], 3)
-    info.add_ellipsoid_aoi(aois[1,0], aois[1,1], aois[1,2], aois[1,3], aois[1,4], 3, mask3)
-    info.add_ellipsoid_aoi(aois[1,0], aois[1,1], aois[1,2], aois[1,3], aois[1,4], 3, mask4)
+    info.add_ellipsoid_aoi(aois[1,0], aois[1,1], aois[1,2], aois[1,3], aois[1,4], 3, halfplanes=lower_right)
+    info.add_ellipsoid_aoi(aois[1,0], aois[1,1], aois[1,2], aois[1,3], aois[1,4], 3, halfplanes=upper_right)
 
     # Screen 4: halved left ellipse, halved right ellipse
-    info.add_ellipsoid_aoi(aois[0,0], aois[0,1], aois[0,2], aois[0,3], aois[0,4], 4, mask1)
-    info.add_ellipsoid_aoi(aois[0,0], aois[0,1], aois[0,2], aois[0,3], aois[0,4], 4, mask2)
-    info.add_ellipsoid_aoi(aois[1,0], aois[1,1], aois[1,2], aois[1,3], aois[1,4], 4, mask3)
-    info.add_ellipsoid_aoi(aois[1,0], aois[1,1], aois[1,2], aois[1,3], aois[1,4], 4, mask4)
+    info.add_ellipsoid_aoi(aois[0,0], aois[0,1], aois[0,2], aois[0,3], aois[0,4], 4, halfplanes=upper_left)
+    info.add_ellipsoid_aoi(aois[0,0], aois[0,1], aois[0,2], aois[0,3], aois[0,4], 4, halfplanes=lower_left)
+    info.add_ellipsoid_aoi(aois[1,0], aois[1,1], aois[1,2], aois[1,3], aois[1,4], 4, halfplanes=lower_right)
+    info.add_ellipsoid_aoi(aois[1,0], aois[1,1], aois[1,2], aois[1,3], aois[1,4], 4, halfplanes=upper_right)
 
 def make_screen_idx(n_trials, featmap):
     """Sets screen and AoIs for MOAT experiment.
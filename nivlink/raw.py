@@ -1,14 +1,76 @@
-import os, re
+import os, re, json, shutil
 import numpy as np
 from copy import deepcopy
-from .edf import edf_read
+from datetime import datetime
 
 def _load_npz(fname):
     """Load raw from NumPy compressed file."""
     npz = np.load(fname, allow_pickle=True)
     return (npz['info'].tolist(), npz['data'], npz['blinks'], 
             npz['saccades'], npz['messages'], 
-            tuple(npz['ch_names']), tuple(npz['eye_names']))
+            tuple(npz['ch_names']), tuple(np.atleast_1d(npz['eye_names'])))
+
+def _json_default(obj):
+    """Encode metadata not natively supported by JSON."""
+    if isinstance(obj, datetime): return {'__datetime__': obj.isoformat()}
+    if isinstance(obj, np.generic): return obj.item()
+    raise TypeError('Object of type %s is not JSON serializable.' %type(obj).__name__)
+
+def _json_hook(obj):
+    """Decode metadata encoded by `_json_default`."""
+    if '__datetime__' in obj: return datetime.fromisoformat(obj['__datetime__'])
+    return obj
+
+def _load_dir(fname, mmap_mode='r'):
+    """Load raw from directory of NumPy files (data is memory-mapped or chunked)."""
+    with open(os.path.join(fname, 'info.json'), 'r') as f: 
+        meta = json.load(f, object_hook=_json_hook)
+    load = lambda name, **kwargs: np.load(os.path.join(fname, '%s.npy' %name), **kwargs)
+    if os.path.isdir(os.path.join(fname, 'data')):
+        from .store import ChunkedArray
+        data = ChunkedArray(os.path.join(fname, 'data'))
+    else:
+        data = load('data', mmap_mode=mmap_mode)
+    return (meta['info'], data, load('blinks'),
+            load('saccades'), load('messages', allow_pickle=True),
+            tuple(meta['ch_names']), tuple(meta['eye_names']))
+
+def _save_dir(fname, info, data, blinks, saccades, messages, ch_names, eye_names,
+              chunks=None, codec='shuffle'):
+    """Save raw to directory of uncompressed NumPy files.
+    
+    Each file is written to a temporary name and then moved into place, so
+    that readers never observe partially written files (and so that a Raw
+    memory-mapped from the same directory can be saved over itself). If
+    `chunks` is given, data are instead written to chunked storage (see
+    `nivlink.store`) in a `data` subdirectory.
+    """
+    if not os.path.isdir(fname): os.makedirs(fname)
+    
+    def replace(name, write):
+        tmp = os.path.join(fname, '.%s.%s.tmp' %(name, os.getpid()))
+        with open(tmp, 'wb') as f: write(f)
+        os.replace(tmp, os.path.join(fname, name))
+    
+    ## Save data.
+    if chunks is None:
+        replace('data.npy', lambda f: np.save(f, np.asarray(data)))
+        if os.path.isdir(os.path.join(fname, 'data')): shutil.rmtree(os.path.join(fname, 'data'))
+    else:
+        from .store import save_chunked
+        tmp = os.path.join(fname, '.data.%s.tmp' %os.getpid())
+        save_chunked(tmp, data, ch_names, chunks, codec)
+        if os.path.isdir(os.path.join(fname, 'data')):
+            os.replace(os.path.join(fname, 'data'), tmp + '.old')
+            shutil.rmtree(tmp + '.old')
+        os.replace(tmp, os.path.join(fname, 'data'))
+        if os.path.isfile(os.path.join(fname, 'data.npy')): os.remove(os.path.join(fname, 'data.npy'))
+    
+    ## Save events and metadata.
+    for name, arr in [('blinks', blinks), ('saccades', saccades), ('messages', messages)]:
+        replace('%s.npy' %name, lambda f: np.save(f, np.asarray(arr)))
+    meta = dict(info=info, ch_names=list(ch_names), eye_names=list(eye_names))
+    replace('info.json', lambda f: f.write(json.dumps(meta, default=_json_default).encode()))
 
 class Raw(object):
     """Raw data instance.
@@ -16,7 +78,28 @@ class Raw(object):
     Parameters
     ----------
     fname : str
-        The raw file to load. Supported file extensions are .edf and .npz.
+        The raw file to load. Supported file extensions are .edf, .asc and .npz.
+        Directories written by `Raw.save(..., compress=False)` are also supported.
+    fields : list | None
+        Sample channels to read from EDF files (e.g. 'gx', 'gy', 'pupil', 
+        'gxvel', 'gyvel', 'px', 'py', 'hx', 'hy', 'flags'). Defaults to 
+        ('gx', 'gy', 'pupil'). ASC files support only 'gx', 'gy', 'pupil', 
+        and (if recorded) 'gxvel', 'gyvel', 'rx', 'ry'. Ignored for .npz files.
+    mmap_mode : 'r' | 'c' | None
+        Memory-map mode for data saved with `compress=False`. If 'r', data are
+        read-only and loaded from disk only as accessed. If 'c', data can be
+        modified in memory without changing the file. If None, data are read
+        into memory.
+    cache_dir : str | EDFCache | None
+        If not None, cache parsed .edf and .asc files in this directory (see
+        `nivlink.edf.cache.EDFCache`). Later reads of an unchanged file load
+        the cached arrays instead of parsing the file again.
+    dtype : dtype | None
+        Data type of samples: float32, float64 or a signed integer type 
+        (e.g. int16 for gaze in pixels). If None, samples are read as float64 
+        (or loaded in their saved type). Integer samples are rounded, and 
+        missing samples are set to the minimum of the type (e.g. -32768). In
+        float samples, missing samples keep the EDF value (1e8).
         
     Attributes
     ----------
@@ -25,7 +108,8 @@ class Raw(object):
     n_samp : int
         Total number of samples in the raw file.
     data : array, shape (n_times, n_eyes, n_channels)
-        Recording samples comprised of gaze_x, gaze_y, pupil.
+        Recording samples (by default comprised of gaze_x, gaze_y, pupil).
+        A `ChunkedArray` if loaded from chunked storage.
     ch_names : list
         Names of data channels.
     eye_names : list
@@ -53,16 +137,32 @@ class Raw(object):
     data, the order of data is left followed by right eye.    
     """
     
-    def __init__(self, fname):
+    def __init__(self, fname, fields=None, mmap_mode='r', cache_dir=None, dtype=None):
         
         ## Read file.
         _, ext = os.path.splitext(fname.lower())
-        if ext == '.edf':
-            info, data, blinks, saccades, messages, ch_names, eye_names = edf_read(fname)
+        read_dtype = np.float64 if dtype is None else dtype
+        if cache_dir is not None and ext in ('.edf', '.asc'):
+            from .edf.cache import EDFCache
+            cache = cache_dir if isinstance(cache_dir, EDFCache) else EDFCache(cache_dir)
+            info, data, blinks, saccades, messages, ch_names, eye_names = cache.read(fname, fields, mmap_mode, read_dtype)
+        elif os.path.isdir(fname):
+            info, data, blinks, saccades, messages, ch_names, eye_names = _load_dir(fname, mmap_mode)
+        elif ext == '.edf':
+            from .edf import edf_read
+            info, data, blinks, saccades, messages, ch_names, eye_names = edf_read(fname, fields, read_dtype)
+        elif ext == '.asc':
+            from .edf import asc_read
+            info, data, blinks, saccades, messages, ch_names, eye_names = asc_read(fname, fields, dtype=read_dtype)
         elif ext == '.npz':
             info, data, blinks, saccades, messages, ch_names, eye_names = _load_npz(fname)
         else: 
-            raise IOError('Raw supports only .edf or .npz files.')
+            raise IOError('Raw supports only .edf, .asc or .npz files.')
+            
+        ## Convert saved samples.
+        if dtype is not None and np.dtype(dtype) != data.dtype:
+            from .edf.utils import convert_samples
+            data = convert_samples(np.asarray(data), dtype)
                 
         ## Store metadata.
         self.info = info
@@ -82,14 +182,151 @@ class Raw(object):
     def copy(self):
         """Return copy of Raw instance."""
         return deepcopy(self)
+
+    def iter_chunks(self, n_samples):
+        """Iterate over recording in blocks of samples.
+
+        Parameters
+        ----------
+        n_samples : int
+            Number of samples per block. The last block may be shorter.
+
+        Yields
+        ------
+        start : int
+            Sample index of the first sample in the block.
+        data : array, shape (n_samples, n_eyes, n_channels)
+            Recording samples (a view of `data`).
+        blinks : array, shape (i, 2)
+            Blinks ending in the block, detailed by their start and end.
+        saccades : array, shape (j, 2)
+            Saccades ending in the block, detailed by their start and end.
+        messages : array, shape (k, 2)
+            Messages occurring in the block, detailed by their sample and message.
+
+        Notes
+        -----
+        Sample indices are relative to the start of the recording. Events are
+        assigned to the block they end in. Blocks match those yielded by 
+        `nivlink.edf.iter_edf` (which reads EDF files in bounded memory) when 
+        blocks are longer than the event-reporting lag of the EyeLink parser;
+        otherwise, `iter_edf` may assign events to later blocks.
+        """
+        blinks = np.reshape(self.blinks, (-1, 2))
+        saccades = np.reshape(self.saccades, (-1, 2))
+
+        for start in range(0, self.n_samp, n_samples):
+
+            ## Define block (last block absorbs events past the end).
+            stop = start + n_samples
+            if stop >= self.n_samp: stop = np.inf
+            within = lambda ix: np.logical_and(ix >= start, ix < stop)
+
+            yield (start, self.data[start:start+n_samples],
+                   blinks[within(blinks[:,1])], saccades[within(saccades[:,1])],
+                   self.messages[within(self.messages['sample'])])
+
+    def get_intervals(self, kind):
+        """Return interval index of artifacts.
+
+        Parameters
+        ----------
+        kind : 'blinks' | 'saccades'
+            Artifact type.
+
+        Returns
+        -------
+        index : IntervalIndex
+            Index of artifacts, supporting overlap queries (`query`, 
+            `query_many`). Built on first use, and rebuilt if the artifacts
+            are reassigned (but not if modified in place).
+        """
+        from .artifacts import IntervalIndex
+        if kind not in ('blinks', 'saccades'): raise ValueError('kind must be "blinks" or "saccades".')
+        intervals = getattr(self, '_intervals', dict())
+        artifacts = getattr(self, kind)
+        if kind not in intervals or intervals[kind][0] is not artifacts:
+            intervals[kind] = (artifacts, IntervalIndex(artifacts))
+            self._intervals = intervals
+        return intervals[kind][1]
+
+    def interpolate_blinks(self, method='linear', pad=0.0, picks='pupil'):
+        """Interpolate samples across blinks (in place).
+
+        Parameters
+        ----------
+        method : 'linear' | 'cubic'
+            Interpolation method (see `nivlink.artifacts.interpolate_blinks`).
+        pad : float
+            Time (in seconds) to extend each blink by on either side.
+        picks : str | list
+            Channels to interpolate by name.
+
+        Returns
+        -------
+        raw : instance of `Raw`
+            Raw with samples interpolated across blinks in all eyes. Data 
+            memory-mapped read-only (`mmap_mode='r'`) cannot be modified;
+            load with `mmap_mode='c'` or None instead.
+        """
+        from .artifacts import interpolate_blinks
+        picks = (picks,) if isinstance(picks, str) else tuple(picks)
+        invalid = [ch for ch in picks if ch not in self.ch_names]
+        if invalid: raise ValueError('Channels not in raw: %s' %', '.join(invalid))
+        channels = [list(self.ch_names).index(ch) for ch in picks]
+        pad = int(np.rint(pad * self.info['sfreq']))
+        interpolate_blinks(self.data, self.blinks, method, pad, channels)
+        return self
+
+    def _message_index(self):
+        """Return index of messages (rebuilt if messages are reassigned)."""
+        index = getattr(self, '_index', None)
+        if index is None or index['messages'] is not self.messages:
+            messages = [str(msg) for msg in self.messages['message']]
+            text = '\n'.join(messages)
+            starts = np.cumsum([0] + [len(msg) + 1 for msg in messages[:-1]])
+            index = dict(messages=self.messages, list=messages, text=text, starts=starts,
+                         lines=text.count('\n') == max(len(messages) - 1, 0), cache=dict())
+            self._index = index
+        return index
+
+    def _match_messages(self, patterns):
+        """Return indices of messages matching each pattern (cached by pattern)."""
+        index = self._message_index()
+        cache, text, starts = index['cache'], index['text'], index['starts']
+        
+        ## Key compiled patterns by source and flags.
+        key = lambda pattern: (pattern.pattern, pattern.flags) if isinstance(pattern, re.Pattern) else pattern
+        uncached = {key(pattern): pattern for pattern in patterns if key(pattern) not in cache}
+        
+        ## Literal patterns: find occurrences in joined text.
+        regex = []
+        for k, pattern in uncached.items():
+            if isinstance(pattern, re.Pattern) or not pattern or re.escape(pattern) != pattern or not index['lines']:
+                regex.append((k, pattern))
+                continue
+            hits = [m.start() for m in re.finditer(pattern, text)]
+            cache[k] = np.unique(np.searchsorted(starts, hits, side='right') - 1)
+        
+        ## Regex patterns: single pass over messages.
+        if regex:
+            searches = [re.compile(pattern).search for _, pattern in regex]
+            hits = [[] for _ in regex]
+            for i, msg in enumerate(index['list']):
+                for search, ix in zip(searches, hits):
+                    if search(msg) is not None: ix.append(i)
+            for (k, _), ix in zip(regex, hits): cache[k] = np.array(ix, dtype=int)
+                
+        return [cache[key(pattern)] for pattern in patterns]
     
     def find_events(self, pattern, return_messages=False):
         """Find events from messages.
 
         Parameters
         ----------
-        pattern : string
-            Pattern to search for in messages. Supports regex.
+        pattern : string | re.Pattern | list
+            Pattern to search for in messages. Supports regex (as strings or
+            compiled patterns). If list, search for each pattern.
         return_messages : bool
             Return matching messages.
 
@@ -99,20 +336,80 @@ class Raw(object):
             Event times (in seconds) corresponding to events that were found.
         messages : array, shape (n_events,)
             Corresponding messages. Returns if return_messages = True.
+            
+        Notes
+        -----
+        Messages are indexed on first search, and matches are cached by
+        pattern, so repeated searches are fast. Patterns without regex
+        metacharacters are found by substring search. If `pattern` is a
+        list, a list of results (one per pattern) is returned, and all
+        uncached patterns are matched in a single pass over the messages.
+        The index is rebuilt if `messages` is reassigned, but not if it is
+        modified in place.
         """
-
+        
         ## Identify matching messages.
-        f = lambda string: True if re.search(pattern,string) is not None else False
-        ix = [f(msg) for msg in self.messages['message']]
-
+        single = isinstance(pattern, (str, re.Pattern))
+        patterns = [pattern] if single else list(pattern)
+        matches = self._match_messages(patterns)
+        
         ## Gather events.
-        onsets = self.messages['sample'][ix]
-        messages = self.messages['message'][ix]
+        results = []
+        for ix in matches:
+            onsets = self.messages['sample'][ix]
+            if return_messages: results.append((onsets, self.messages['message'][ix]))
+            else: results.append(onsets)
+            
+        return results[0] if single else results
+            
+    def events_table(self, pattern=None):
+        """Tabulate events from messages.
+
+        Parameters
+        ----------
+        pattern : string | None
+            Pattern to search for in messages. Supports regex. Named groups 
+            (e.g. r'TRIALID (?P<trial>\\d+)') become columns of the table. If 
+            None, all messages are returned.
 
-        if return_messages: return onsets, messages
-        else: return onsets
+        Returns
+        -------
+        events : pandas.DataFrame
+            Table of matching messages, with columns 'sample' and 'message' 
+            followed by one column per named group. Group columns are numeric 
+            if all matched values are numeric (float if any are missing), 
+            otherwise strings.
+            
+        Notes
+        -----
+        Tables are built with vectorized string operations over the messages
+        matched by `find_events`, and are cached by pattern.
+        """
+        from pandas import DataFrame, to_numeric
+        
+        ## Check cache.
+        index = self._message_index()
+        tables = index.setdefault('tables', dict())
+        if pattern in tables: return tables[pattern].copy()
+        
+        ## Identify matching messages.
+        if pattern is None: ix = np.arange(len(index['list']))
+        else: ix, = self._match_messages([pattern])
+        table = DataFrame(dict(sample=self.messages['sample'][ix], 
+                               message=np.array(index['list'], dtype=object)[ix]))
+        
+        ## Extract named groups.
+        if pattern is not None and re.compile(pattern).groupindex:
+            groups = table['message'].str.extract(pattern, expand=True)
+            for name in re.compile(pattern).groupindex:
+                try: table[name] = to_numeric(groups[name])
+                except (ValueError, TypeError): table[name] = groups[name]
             
-    def save(self, fname, overwrite=False):
+        tables[pattern] = table
+        return table.copy()
+    
+    def save(self, fname, overwrite=False, compress=True, chunks=None, codec='shuffle', 
+             dtype=None):
         """Save data to NumPy compressed format.
         
         Parameters
@@ -121,13 +418,115 @@ class Raw(object):
             Filename to use.
         overwrite : bool
             If True, overwrite file (if it exists).
+        compress : bool
+            If True, save to a NumPy compressed (.npz) file. If False, save 
+            to a directory of uncompressed NumPy (.npy) files and metadata
+            (info.json), which `Raw` opens by memory-mapping the data.
+        chunks : int | None
+            If not None, save to a directory (as with `compress=False`) but
+            store data in chunks of this many samples, compressed per channel.
+            `Raw` then opens data as a `ChunkedArray`, which reads from disk
+            only the samples, eyes and channels that are indexed.
+        codec : 'none' | 'zlib' | 'shuffle' | dict
+            Codec of chunked data. If dict, maps channel names to codecs.
+        dtype : dtype | None
+            Data type of saved samples (see `Raw`). If None, samples are 
+            saved in their current type.
         """
         
         ## Check if exists.
-        if os.path.isfile(fname) and not overwrite: 
+        if os.path.exists(fname) and not overwrite: 
             raise IOError('file "%s" already exists.' %fname) 
         
+        ## Convert samples.
+        data = self.data
+        if dtype is not None and np.dtype(dtype) != data.dtype:
+            from .edf.utils import convert_samples
+            data = convert_samples(np.asarray(data), dtype)
+        
+        ## Save uncompressed.
+        if not compress or chunks is not None:
+            _save_dir(fname, self.info, data, self.blinks, self.saccades, 
+                      self.messages, self.ch_names, self.eye_names, chunks, codec)
+            return
+        
         ## Otherwise save.
-        np.savez_compressed(fname, info=self.info, data=self.data, blinks=self.blinks, 
+        np.savez_compressed(fname, info=self.info, data=data, blinks=self.blinks, 
                             saccades=self.saccades, messages=self.messages, 
-                            ch_names=self.ch_names, eye_names=self.eye_names)
\ No newline at end of file
+                            ch_names=self.ch_names, eye_names=self.eye_names)
+
+
+def _read_to_dir(fname, fields, dtype, path):
+    """Read raw file and save to uncompressed format (process pool worker)."""
+    Raw(fname, fields, mmap_mode=None, dtype=dtype).save(path, compress=False)
+    return path
+
+def read_raws(fnames, n_jobs=1, fields=None, errors='raise', dtype=None):
+    """Read many raw files in parallel.
+    
+    Parameters
+    ----------
+    fnames : list
+        Raw files to load (any file supported by `Raw`).
+    n_jobs : int
+        Number of worker processes. If -1, use all CPUs.
+    fields : list | None
+        Sample channels to read (see `Raw`).
+    errors : 'raise' | 'warn'
+        If 'raise', raise an error listing every file that failed to load.
+        If 'warn', warn per file and return None in place of its Raw.
+    dtype : dtype | None
+        Data type of samples (see `Raw`).
+        
+    Returns
+    -------
+    raws : list
+        Raw instances, in the order of `fnames`.
+        
+    Notes
+    -----
+    Files are parsed in a process pool, as reading EDF files holds the GIL. 
+    Rather than pickling arrays back to the parent process, each worker saves 
+    its recording to a temporary directory in the uncompressed format (see 
+    `Raw.save`), which the parent opens memory-mapped copy-on-write (so that,
+    as for `n_jobs=1`, data can be modified in place). The temporary files 
+    are then unlinked; their memory-mapped data remain valid.
+    """
+    import tempfile, warnings
+    from concurrent.futures import ProcessPoolExecutor
+    
+    ## Error-catching.
+    if errors not in ('raise', 'warn'): raise ValueError('errors must be "raise" or "warn".')
+    fnames = list(fnames)
+    if n_jobs == -1: n_jobs = os.cpu_count()
+    n_jobs = max(1, min(int(n_jobs), len(fnames)))
+    
+    raws, failed = [None] * len(fnames), []
+    
+    ## Read files in serial.
+    if n_jobs == 1:
+        for i, fname in enumerate(fnames):
+            try: raws[i] = Raw(fname, fields, dtype=dtype)
+            except Exception as e: failed.append((fname, e))
+    
+    ## Read files in parallel.
+    else:
+        tmp_dir = tempfile.mkdtemp(prefix='nivlink-')
+        try:
+            with ProcessPoolExecutor(n_jobs) as executor:
+                futures = [executor.submit(_read_to_dir, fname, fields, dtype, os.path.join(tmp_dir, str(i)))
+                           for i, fname in enumerate(fnames)]
+                for i, (fname, future) in enumerate(zip(fnames, futures)):
+                    try: raws[i] = Raw(future.result(), mmap_mode='c')
+                    except Exception as e: failed.append((fname, e))
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            
+    ## Report failures.
+    if failed and errors == 'raise':
+        msg = '\n'.join('  %s: %r' %(fname, e) for fname, e in failed)
+        raise IOError('Failed to read %s file(s):\n%s' %(len(failed), msg))
+    for fname, e in failed:
+        warnings.warn('Failed to read "%s": %r' %(fname, e))
+    
+    return raws
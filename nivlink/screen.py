@@ -25,14 +25,18 @@ def _ellipse_in_shape(shape, center, radii, rotation=0.):
     """
     # https://github.com/scikit-image/scikit-image/blob/master/skimage/draw/draw.py
     r_lim, c_lim = np.ogrid[0:float(shape[0]), 0:float(shape[1])]
+    return np.nonzero(_ellipse_distances(r_lim, c_lim, center, radii, rotation) < 1)
+
+def _ellipse_distances(r_lim, c_lim, center, radii, rotation=0.):
+    """Squared (normalized) distances of points from center of ellipse; 
+    points with distances < 1 lie within the ellipse."""
     r_org, c_org = center
     r_rad, c_rad = radii
     rotation %= np.pi
     sin_alpha, cos_alpha = np.sin(rotation), np.cos(rotation)
     r, c = (r_lim - r_org), (c_lim - c_org)
-    distances = ((r * cos_alpha + c * sin_alpha) / r_rad) ** 2 \
-                + ((r * sin_alpha - c * cos_alpha) / c_rad) ** 2
-    return np.nonzero(distances < 1)
+    return ((r * cos_alpha + c * sin_alpha) / r_rad) ** 2 \
+           + ((r * sin_alpha - c * cos_alpha) / c_rad) ** 2
 
 def _ellipse(x, y, x_radius, y_radius, shape=None, rotation=0.):
     """Generate coordinates of pixels within ellipse.
@@ -68,8 +72,23 @@ def _ellipse(x, y, x_radius, y_radius, shape=None, rotation=0.):
     on the other side of image, because ``image[-1, -1] = image[end-1, end-1]``
     """
     # https://github.com/scikit-image/scikit-image/blob/master/skimage/draw/draw.py
-    center = np.array([x, y])
     radii = np.array([x_radius, y_radius])
+    center, upper_left, lower_right = _ellipse_bounds(x, y, x_radius, y_radius, shape, rotation)
+
+    shifted_center = center - upper_left
+    bounding_shape = lower_right - upper_left + 1
+
+    rr, cc = _ellipse_in_shape(bounding_shape, shifted_center, radii, rotation)
+    rr.flags.writeable = True
+    cc.flags.writeable = True
+    rr += upper_left[0]
+    cc += upper_left[1]
+    return rr, cc
+
+def _ellipse_bounds(x, y, x_radius, y_radius, shape=None, rotation=0.):
+    """Return center, and upper-left and lower-right corners of smallest 
+    rectangle (of pixels) containing ellipse, bounded by shape."""
+    center = np.array([x, y])
     
     # allow just rotation with in range +/- 180 degree
     rotation %= np.pi
@@ -90,15 +109,92 @@ def _ellipse(x, y, x_radius, y_radius, shape=None, rotation=0.):
         upper_left = np.maximum(upper_left, np.array([0, 0]))
         lower_right = np.minimum(lower_right, np.array(shape[:2]) - 1)
 
-    shifted_center = center - upper_left
-    bounding_shape = lower_right - upper_left + 1
+    return center, upper_left, lower_right
 
-    rr, cc = _ellipse_in_shape(bounding_shape, shifted_center, radii, rotation)
-    rr.flags.writeable = True
-    cc.flags.writeable = True
-    rr += upper_left[0]
-    cc += upper_left[1]
-    return rr, cc
+def _crossings(xi, yi, xj, yj, y):
+    """x-coordinates at which edges from (xi, yi) to (xj, yj) cross rows y."""
+    return (xj - xi) * (y - yi) / (yj - yi) + xi
+
+def _polygon(vertices, shape):
+    """Generate coordinates of pixels within polygon (even-odd rule).
+    
+    Parameters
+    ----------
+    vertices : array, shape (n_vertices, 2)
+        Coordinates (x, y) of polygon vertices.
+    shape : tuple
+        Screen shape, (xdim, ydim).
+        
+    Returns
+    -------
+    xx, yy : ndarray of int
+        Pixel coordinates of polygon.
+        
+    Notes
+    -----
+    A pixel lies within the polygon if a ray from it along increasing x 
+    crosses an odd number of edges, counting edges whose (half-open) range
+    of y contains the pixel (as in PNPOLY). Crossings of each edge with each 
+    row it spans are computed at once, sorted within rows, and the spans 
+    between successive pairs filled, so that cost scales with the number of 
+    crossings and pixels filled rather than the screen or bounding box area.
+    """
+    xi, yi = np.asarray(vertices, dtype=float).T
+    xj, yj = np.roll(xi, -1), np.roll(yi, -1)
+
+    ## Enumerate rows spanned by each edge, i.e. min(yi, yj) <= y < max(yi, yj).
+    lo = np.clip(np.ceil(np.minimum(yi, yj)), 0, shape[1]).astype(int)
+    hi = np.clip(np.ceil(np.maximum(yi, yj)), 0, shape[1]).astype(int)
+    counts = np.maximum(hi - lo, 0)
+    edge = np.repeat(np.arange(xi.size), counts)
+    y = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts - lo, counts)
+    
+    ## Sort crossings by row, then x. Each row is crossed an even number of times.
+    x = _crossings(xi[edge], yi[edge], xj[edge], yj[edge], y)
+    order = np.lexsort((x, y))
+    x, y = x[order], y[order]
+    
+    ## Fill pixels between successive pairs of crossings.
+    start = np.clip(np.ceil(x[0::2]), 0, shape[0]).astype(int)
+    stop = np.clip(np.ceil(x[1::2]), 0, shape[0]).astype(int)
+    lengths = np.maximum(stop - start, 0)
+    xx = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths - start, lengths)
+    yy = np.repeat(y[0::2], lengths)
+    return xx, yy
+
+def _in_polygon(x, y, vertices):
+    """Test whether pixels lie within polygon (even-odd rule, as `_polygon`)."""
+    xi, yi = np.asarray(vertices, dtype=float).T
+    xj, yj = np.roll(xi, -1), np.roll(yi, -1)
+    x, y = np.ravel(x), np.ravel(y)
+    inside = np.zeros(x.size, dtype=bool)
+    for k in range(xi.size):
+        ix = np.flatnonzero((yi[k] > y) != (yj[k] > y))
+        inside[ix] ^= x[ix] < _crossings(xi[k], yi[k], xj[k], yj[k], y[ix])
+    return inside
+
+def _in_halfplanes(x, y, halfplanes):
+    """Test whether pixels lie on the given side of each line."""
+    inside = np.ones(np.shape(x), dtype=bool)
+    for slope, intercept, side in halfplanes:
+        line = slope * x + intercept
+        inside &= (line < y) if side > 0 else (line > y)
+    return inside
+
+def _in_shape(shape, x, y):
+    """Test whether pixels (within bounding box) lie within vector AoI."""
+    inside = _in_halfplanes(x, y, shape['halfplanes'])
+    if shape['kind'] == 'ellipse':
+        r = (x - shape['origin'][0]).astype(float)
+        c = (y - shape['origin'][1]).astype(float)
+        inside &= _ellipse_distances(r, c, shape['center'], shape['radii'], shape['rotation']) < 1
+    elif shape['kind'] == 'polygon':
+        inside &= _in_polygon(x, y, shape['vertices']).reshape(inside.shape)
+    elif shape['kind'] == 'mask':
+        flat = x * shape['stride'] + y
+        ix = np.minimum(np.searchsorted(shape['pixels'], flat), shape['pixels'].size - 1)
+        inside &= shape['pixels'][ix] == flat
+    return inside
 
 class Screen(object):
     """Container for stimulus information.
@@ -112,32 +208,191 @@ class Screen(object):
     n_screens: int
         Number different screens corresponding to different
         AoI distributions. Defauls to 1.
+    backend : 'raster' | 'vector'
+        If 'raster', AoIs are drawn into a look-up table of pixels. If 
+        'vector', only the parameters of AoIs are stored, and gaze positions
+        are classified by testing whether they lie within each AoI. The 
+        vector backend needs no memory proportional to the screen size, 
+        but aligns gaze data several times (about 3x) more slowly.
 
     Attributes
     ----------
     labels : array
         List of unique AoIs.
-    indices : array, shape (xdim, ydim)
-        Look-up table matching pixels to AoIs.          
+    indices : array, shape (xdim, ydim, n_screens)
+        Look-up table matching pixels to AoIs. Stored in the smallest 
+        unsigned integer type holding all labels (e.g. uint8 for up to 
+        255 AoIs). For the vector backend, rasterized on first access (and
+        cached until AoIs are added); use `classify` to avoid allocating it.
+        
+    Notes
+    -----
+    New AoIs are labeled from a counter, without scanning the look-up
+    table. Labels are compacted (i.e. AoIs fully covered by later AoIs are
+    removed, and the rest numbered in order) once, by `finalize`, which is 
+    called on first access of `indices` or `labels` after AoIs are added.
+    
+    The vector backend uses no memory proportional to the screen size, and
+    gives the same labels as the raster backend at every pixel.
     """
     
-    def __init__(self, xdim, ydim, n_screens=1):
+    def __init__(self, xdim, ydim, n_screens=1, backend='raster'):
+        
+        if backend not in ('raster', 'vector'):
+            raise ValueError('backend must be "raster" or "vector".')
         
         self.xdim = xdim
         self.ydim = ydim
         self.n_screens = n_screens
+        self.backend = backend
 
-        self.labels = ()
-        self.indices = np.zeros((xdim,ydim,n_screens))
+        self._indices = np.zeros((xdim,ydim,n_screens), dtype=np.uint8) \
+                        if backend == 'raster' else None
+        self._shapes = []
+        self._raster = None
+        self._n_labels = 0
+        self._finalized = True
         
-    def _update_aoi(self):
-        """Convenience function for updating AoI indices."""
-
-        values, indices = np.unique(self.indices, return_inverse=True)
+    @property
+    def indices(self):
+        if not self._finalized: self.finalize()
+        if self.backend == 'vector':
+            if self._raster is None:
+                x, y = np.meshgrid(np.arange(self.xdim), np.arange(self.ydim), indexing='ij')
+                self._raster = np.stack([self.classify(x, y, ix) for ix in range(self.n_screens)], 
+                                        axis=-1)
+            return self._raster
+        return self._indices
+    
+    @indices.setter
+    def indices(self, indices):
+        if self.backend == 'vector':
+            raise ValueError('indices cannot be set for vector backend.')
+        indices = np.asarray(indices)
+        if indices.shape != (self.xdim, self.ydim, self.n_screens):
+            raise ValueError('indices must be of shape (xdim, ydim, n_screens).')
+        self._n_labels = int(indices.max()) if indices.size else 0
+        self._indices = indices.astype(np.min_scalar_type(self._n_labels))
+        self._finalized = False
+        
+    @property
+    def labels(self):
+        if not self._finalized: self.finalize()
+        return tuple(range(1, self._n_labels + 1))
+        
+    def _next_label(self):
+        """Return label of new AoI, widening indices if it does not fit."""
+        
+        label = self._n_labels + 1
+        if self.backend == 'raster':
+            dtype = np.promote_types(self._indices.dtype, np.min_scalar_type(label))
+            if dtype != self._indices.dtype: self._indices = self._indices.astype(dtype)
+        self._n_labels, self._finalized = label, False
+        return label
+    
+    def _add_shape(self, kind, screen_id, xlim, ylim, **params):
+        """Store vector AoI with bounding box [xlim[0], xlim[1]) x [ylim[0], ylim[1])."""
+        
+        params.setdefault('halfplanes', ())
+        self._raster = None
+        self._shapes.append(dict(kind=kind, label=self._next_label(), screen=screen_id - 1,
+                                 bounds=(int(xlim[0]), int(xlim[1]), int(ylim[0]), int(ylim[1])),
+                                 **params))
+        
+    def _is_visible(self, i, block_size=2**16):
+        """Test whether vector AoI covers any pixel not covered by later AoIs."""
+        
+        shape = self._shapes[i]
+        x0, x1, y0, y1 = shape['bounds']
+        later = [other for other in self._shapes[i+1:] if other['screen'] == shape['screen']]
+        
+        ## Test pixels of bounding box, in blocks of rows.
+        step = max(1, block_size // max(y1 - y0, 1))
+        for start in range(x0, x1, step):
+            x, y = np.meshgrid(np.arange(start, min(start + step, x1)), np.arange(y0, y1), 
+                               indexing='ij')
+            visible = _in_shape(shape, x, y)
+            for other in later:
+                ox0, ox1, oy0, oy1 = other['bounds']
+                box = (x >= ox0) & (x < ox1) & (y >= oy0) & (y < oy1)
+                if box.any(): visible[box] &= ~_in_shape(other, x[box], y[box])
+            if visible.any(): return True
+        return False
+        
+    def finalize(self):
+        """Compact AoI labels.
+        
+        Returns
+        -------
+        None
+            `indices` and `labels` modified in place.
+        """
+        
+        if self.backend == 'vector':
+            
+            ## Remove AoIs covering no pixels, and relabel the rest in order.
+            self._shapes = [shape for i, shape in enumerate(self._shapes) if self._is_visible(i)]
+            for label, shape in enumerate(self._shapes): shape['label'] = label + 1
+            self._raster = None
+            self._n_labels, self._finalized = len(self._shapes), True
+            return
 
-        if np.all(values): indices += 1
-        self.indices = indices.reshape(self.xdim, self.ydim, self.n_screens)
-        self.labels = tuple(range(1,int(self.indices.max())+1))
+        ## Relabel AoIs in order (0 remains no AoI, if present).
+        present = np.bincount(self._indices.ravel(), minlength=self._n_labels + 1) > 0
+        remap = np.cumsum(present) - present[0]
+        
+        ## Store in smallest unsigned integer type.
+        remap = remap.astype(np.min_scalar_type(remap[-1]))
+        self._indices = remap[self._indices]
+        self._n_labels, self._finalized = int(remap[-1]), True
+        
+    def classify(self, x, y, screen_ix=0):
+        """Return AoIs at gaze positions.
+        
+        Parameters
+        ----------
+        x, y : array
+            Gaze positions (in pixels), rounded down to the nearest pixel.
+        screen_ix : int | array
+            Screen of each position (zero-indexed, as in the mapping of 
+            `align_to_aoi`). Broadcast against positions.
+            
+        Returns
+        -------
+        labels : array
+            AoI of each position (0 if not in an AoI, off screen or missing),
+            of the same data type as `indices`.
+        """
+        
+        if not self._finalized: self.finalize()
+        x, y, screen_ix = np.broadcast_arrays(x, y, screen_ix)
+        valid = (x >= 0) & (x < self.xdim) & (y >= 0) & (y < self.ydim)
+        ix = np.flatnonzero(valid)
+        xi = x.ravel()[ix].astype(np.int64)
+        yi = y.ravel()[ix].astype(np.int64)
+        si = screen_ix.ravel()[ix].astype(np.int64)
+        
+        labels = np.zeros(x.size, dtype=np.min_scalar_type(self._n_labels))
+        if self.backend == 'raster':
+            labels[ix] = self._indices[xi, yi, si]
+            return labels.reshape(x.shape)
+        
+        ## Sort positions by screen, then x (so that positions within the
+        ## x-range of an AoI are contiguous), and test those within its 
+        ## bounding box. Later AoIs overwrite earlier ones.
+        key = si * self.xdim + xi
+        order = np.argsort(key, kind='stable')
+        key = key[order]
+        for shape in self._shapes:
+            x0, x1, y0, y1 = shape['bounds']
+            offset = shape['screen'] * self.xdim
+            lo, hi = np.searchsorted(key, [offset + x0, offset + x1])
+            if hi <= lo or y1 <= y0: continue
+            cand = order[lo:hi]
+            cand = cand[(yi[cand] >= y0) & (yi[cand] < y1)]
+            cand = cand[_in_shape(shape, xi[cand], yi[cand])]
+            labels[ix[cand]] = shape['label']
+        return labels.reshape(x.shape)
 
     def add_rectangle_aoi(self, xmin, xmax, ymin, ymax, screen_id=1):
 
@@ -163,10 +418,15 @@ class Screen(object):
         xmin, xmax = [int(self.xdim * x) if isfrac(x) else int(x) for x in [xmin,xmax]]
         ymin, ymax = [int(self.ydim * y) if isfrac(y) else int(y) for y in [ymin,ymax]]
         
-        self.indices[xmin:xmax,ymin:ymax,screen_id - 1] = self.indices.max() + 1
-        self._update_aoi()
+        if self.backend == 'vector':
+            self._add_shape('rectangle', screen_id, slice(xmin,xmax).indices(self.xdim)[:2],
+                            slice(ymin,ymax).indices(self.ydim)[:2])
+            return
+        
+        self._indices[xmin:xmax,ymin:ymax,screen_id - 1] = self._next_label()
     
-    def add_ellipsoid_aoi(self, x, y, x_radius, y_radius, rotation=0., screen_id=1, mask=None):
+    def add_ellipsoid_aoi(self, x, y, x_radius, y_radius, rotation=0., screen_id=1, mask=None,
+                          halfplanes=None):
         """Generate coordinates of pixels within ellipse.
 
         Parameters
@@ -182,12 +442,29 @@ class Screen(object):
           Which screen to add AoI to. Defaults to 1.
         mask: int    
           Screen-sized array of 0s and 1s used to mask out parts of the display. Defaults to none.
+          Not supported by the vector backend.
+        halfplanes: list
+          List of (slope, intercept, side) tuples. Keeps pixels above (side=1)
+          or below (side=-1) each line ``y = slope * x + intercept``. Defaults to none.
 
         Returns
         -------
         None
             `indices` and `labels` modified in place.
         """
+        
+        if halfplanes is None: halfplanes = ()
+        
+        if self.backend == 'vector':
+            if mask is not None: raise ValueError('mask is not supported by vector backend (use halfplanes).')
+            center, upper_left, lower_right = _ellipse_bounds(x, y, x_radius, y_radius, 
+                                                              (self.xdim,self.ydim), rotation)
+            self._add_shape('ellipse', screen_id, (upper_left[0], lower_right[0] + 1),
+                            (upper_left[1], lower_right[1] + 1), origin=upper_left, 
+                            center=center - upper_left, radii=(x_radius, y_radius), 
+                            rotation=rotation, halfplanes=tuple(halfplanes))
+            return
+        
         # https://github.com/scikit-image/scikit-image/blob/master/skimage/draw/draw.py
         xx, yy = _ellipse(x, y, x_radius, y_radius, shape=(self.xdim,self.ydim), rotation=rotation)
         
@@ -209,9 +486,71 @@ class Screen(object):
         else: 
             xxf = xx
             yyf = yy
+            
+        # Keep pixels within half-planes.
+        keep = _in_halfplanes(xxf, yyf, halfplanes)
+        xxf, yyf = xxf[keep], yyf[keep]
 
-        self.indices[xxf,yyf,screen_id - 1] = self.indices.max() + 1
-        self._update_aoi()
+        self._indices[xxf,yyf,screen_id - 1] = self._next_label()
+        
+    def add_polygon_aoi(self, vertices, screen_id=1):
+        """Add polygon area of interest to screen.
+        
+        Parameters
+        ----------
+        vertices : array, shape (n_vertices, 2)
+            Coordinates (x, y) of polygon vertices (in pixels), in order. 
+            The polygon is closed automatically. Pixels are included by
+            the even-odd rule, so self-intersecting polygons are allowed.
+        screen_id: int
+          Which screen to add AoI to. Defaults to 1.
+          
+        Returns
+        -------
+        None
+            `indices` and `labels` modified in place.
+        """
+        
+        vertices = np.asarray(vertices, dtype=float)
+        if vertices.ndim != 2 or vertices.shape[1] != 2 or vertices.shape[0] < 3:
+            raise ValueError('vertices must be of shape (n_vertices, 2), with at least 3 vertices.')
+        
+        if self.backend == 'vector':
+            (xmin, ymin), (xmax, ymax) = np.ceil(vertices.min(axis=0)), np.ceil(vertices.max(axis=0))
+            self._add_shape('polygon', screen_id, np.clip([xmin, xmax], 0, self.xdim),
+                            np.clip([ymin, ymax], 0, self.ydim), vertices=vertices)
+            return
+        
+        xx, yy = _polygon(vertices, (self.xdim, self.ydim))
+        self._indices[xx,yy,screen_id - 1] = self._next_label()
+        
+    def add_mask_aoi(self, mask, screen_id=1):
+        """Add area of interest of arbitrary shape to screen.
+        
+        Parameters
+        ----------
+        mask : array, shape (xdim, ydim)
+            Screen-sized array, non-zero at pixels of AoI.
+        screen_id: int
+          Which screen to add AoI to. Defaults to 1.
+          
+        Returns
+        -------
+        None
+            `indices` and `labels` modified in place.
+        """
+        
+        if np.shape(mask) != (self.xdim, self.ydim):
+            raise ValueError('mask must be of shape (xdim, ydim).')
+        xx, yy = np.nonzero(mask)
+        
+        if self.backend == 'vector':
+            xlim, ylim = [(v.min(), v.max() + 1) if v.size else (0, 0) for v in (xx, yy)]
+            self._add_shape('mask', screen_id, xlim, ylim, stride=self.ydim, 
+                            pixels=xx.astype(np.int64) * self.ydim + yy)
+            return
+        
+        self._indices[xx,yy,screen_id - 1] = self._next_label()
         
     def plot_aoi(self, screen_id, height=3, ticks=False, cmap=None):
         """Plot areas of interest.
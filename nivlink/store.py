@@ -0,0 +1,227 @@
+"""Chunked, columnar storage for recording samples.
+
+Samples of shape (n_times, n_eyes, n_channels) are split along time into
+chunks of fixed length. Each chunk of each eye and channel is stored in its
+own file, encoded with that channel's codec. A directory looks like:
+
+    data/
+        meta.json       shape, dtype, chunk length, channel names, codecs
+        0.0.0           eye 0, channel 0, chunk 0
+        0.0.1           eye 0, channel 0, chunk 1
+        ...
+
+Reads open only the files covering the requested window of samples, eyes
+and channels. Files are never modified in place once written, so any number
+of processes or threads may read the same store concurrently.
+"""
+
+import os, json, zlib
+import numpy as np
+
+## Supported codecs.
+codecs = ('none', 'zlib', 'shuffle')
+
+def _encode(arr, codec, level=1):
+    """Encode 1d array to bytes."""
+    if codec == 'none':
+        return arr.tobytes()
+    elif codec == 'zlib':
+        return zlib.compress(arr.tobytes(), level)
+    elif codec == 'shuffle':
+        ## Group bytes by significance before compressing (as in HDF5 shuffle).
+        shuffled = arr.view(np.uint8).reshape(arr.size, arr.itemsize).T
+        return zlib.compress(shuffled.tobytes(), level)
+    raise ValueError('Codec must be one of %s.' %', '.join(codecs))
+
+def _decode(buf, codec, dtype):
+    """Decode bytes to 1d array."""
+    if codec == 'none':
+        return np.frombuffer(buf, dtype=dtype)
+    elif codec == 'zlib':
+        return np.frombuffer(zlib.decompress(buf), dtype=dtype)
+    elif codec == 'shuffle':
+        shuffled = np.frombuffer(zlib.decompress(buf), dtype=np.uint8)
+        return shuffled.reshape(dtype.itemsize, -1).T.copy().view(dtype).ravel()
+    raise ValueError('Codec must be one of %s.' %', '.join(codecs))
+
+def save_chunked(path, data, ch_names, chunks=4096, codec='shuffle', level=1):
+    """Save recording samples to chunked storage.
+
+    Parameters
+    ----------
+    path : str
+        Directory to write to (created if it does not exist).
+    data : array, shape (n_times, n_eyes, n_channels)
+        Recording samples.
+    ch_names : list
+        Names of data channels.
+    chunks : int
+        Number of samples per chunk.
+    codec : 'none' | 'zlib' | 'shuffle' | dict
+        Codec used to encode chunks. If dict, maps channel names to codecs
+        (channels not listed are stored with 'shuffle').
+    level : int
+        Compression level (1-9) for 'zlib' and 'shuffle'.
+    """
+
+    ## Error-catching.
+    data = np.asarray(data)
+    if data.ndim != 3: raise ValueError('data must be of shape (n_times, n_eyes, n_channels).')
+    if len(ch_names) != data.shape[-1]: raise ValueError('ch_names must match number of channels.')
+    if isinstance(codec, str): codec = dict((ch, codec) for ch in ch_names)
+    channel_codecs = [codec.get(ch, 'shuffle') for ch in ch_names]
+    invalid = [c for c in channel_codecs if c not in codecs]
+    if invalid: raise ValueError('Codec must be one of %s.' %', '.join(codecs))
+    chunks = int(chunks)
+    if chunks < 1: raise ValueError('chunks must be a positive integer.')
+
+    if not os.path.isdir(path): os.makedirs(path)
+
+    def replace(name, buf):
+        tmp = os.path.join(path, '.%s.%s.tmp' %(name, os.getpid()))
+        with open(tmp, 'wb') as f: f.write(buf)
+        os.replace(tmp, os.path.join(path, name))
+
+    ## Write chunks.
+    n_times, n_eyes, n_channels = data.shape
+    for k, start in enumerate(range(0, n_times, chunks)):
+        block = data[start:start+chunks]
+        for i in range(n_eyes):
+            for j in range(n_channels):
+                arr = np.ascontiguousarray(block[:,i,j])
+                replace('%s.%s.%s' %(i, j, k), _encode(arr, channel_codecs[j], level))
+
+    ## Write metadata last, so that readers never observe a partial store.
+    meta = dict(shape=list(data.shape), dtype=data.dtype.str, chunks=chunks,
+                ch_names=list(ch_names), codecs=channel_codecs)
+    replace('meta.json', json.dumps(meta).encode())
+
+def _as_indices(key, n):
+    """Convert index along one axis to array of non-negative indices."""
+    if isinstance(key, slice):
+        return np.arange(*key.indices(n))
+    key = np.asarray(key)
+    if key.dtype == bool:
+        if key.shape != (n,): raise IndexError('boolean index does not match axis of length %s.' %n)
+        return np.flatnonzero(key)
+    if not np.issubdtype(key.dtype, np.integer): raise IndexError('only integers, slices and arrays are valid indices.')
+    if np.any((key < -n) | (key >= n)): raise IndexError('index out of bounds for axis of length %s.' %n)
+    return np.atleast_1d(np.where(key < 0, key + n, key))
+
+def _expand_key(key, ndim):
+    """Expand index to one entry per axis."""
+    if not isinstance(key, tuple): key = (key,)
+    if any(k is Ellipsis for k in key):
+        i = [k is Ellipsis for k in key].index(True)
+        key = key[:i] + (slice(None),) * (ndim - len(key) + 1) + key[i+1:]
+    if len(key) > ndim: raise IndexError('too many indices for array.')
+    return key + (slice(None),) * (ndim - len(key))
+
+class _OrthogonalIndexer(object):
+    """Orthogonal (outer) indexing into a ChunkedArray."""
+
+    def __init__(self, arr):
+        self.arr = arr
+
+    def __getitem__(self, key):
+        key = _expand_key(key, self.arr.ndim)
+        index = [_as_indices(k, n) for k, n in zip(key, self.arr.shape)]
+        out = self.arr._read(*index)
+
+        ## Drop axes indexed by scalars.
+        scalar = tuple(0 if np.ndim(k) == 0 and not isinstance(k, slice) else slice(None)
+                       for k in key)
+        return out[scalar]
+
+class ChunkedArray(object):
+    """Read-only view of recording samples in chunked storage.
+
+    Parameters
+    ----------
+    path : str
+        Directory written by `save_chunked`.
+
+    Attributes
+    ----------
+    shape : tuple
+        Shape of the samples, (n_times, n_eyes, n_channels).
+    dtype : dtype
+        Data type of the samples.
+    chunks : int
+        Number of samples per chunk.
+    ch_names : tuple
+        Names of data channels.
+    codecs : tuple
+        Codec of each channel.
+
+    Notes
+    -----
+    Indexing follows NumPy for slices and integers along each axis, but (as
+    in Zarr) arrays along several axes are applied independently of one
+    another (see `oindex`). The result is always a NumPy array. Only chunks
+    overlapping the selection are read from disk.
+    """
+
+    def __init__(self, path):
+
+        with open(os.path.join(path, 'meta.json'), 'r') as f: meta = json.load(f)
+        self.path = path
+        self.shape = tuple(meta['shape'])
+        self.dtype = np.dtype(meta['dtype'])
+        self.chunks = meta['chunks']
+        self.ch_names = tuple(meta['ch_names'])
+        self.codecs = tuple(meta['codecs'])
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    @property
+    def size(self):
+        return int(np.prod(self.shape))
+
+    @property
+    def nbytes(self):
+        return self.size * self.dtype.itemsize
+
+    @property
+    def oindex(self):
+        """Orthogonal indexer, e.g. `arr.oindex[100:200, [0], [0, 2]]`."""
+        return _OrthogonalIndexer(self)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __repr__(self):
+        return '<ChunkedArray | shape {0}, {1} samples per chunk>'.format(self.shape, self.chunks)
+
+    def __getitem__(self, key):
+        return self.oindex[key]
+
+    def __array__(self, dtype=None):
+        arr = self[:]
+        return arr if dtype is None else arr.astype(dtype)
+
+    def _chunk(self, i, j, k):
+        """Read and decode chunk k of eye i, channel j."""
+        with open(os.path.join(self.path, '%s.%s.%s' %(i, j, k)), 'rb') as f:
+            return _decode(f.read(), self.codecs[j], self.dtype)
+
+    def _read(self, times, eyes, channels):
+        """Read samples at the outer product of time, eye and channel indices."""
+        out = np.empty((times.size, eyes.size, channels.size), dtype=self.dtype)
+        if not out.size: return out
+
+        ## Group requested times by chunk.
+        chunk_ix = times // self.chunks
+        order = np.argsort(chunk_ix, kind='stable')
+        bounds = np.flatnonzero(np.diff(chunk_ix[order])) + 1
+
+        for group in np.split(order, bounds):
+            k = chunk_ix[group[0]]
+            local = times[group] - k * self.chunks
+            for a, i in enumerate(eyes):
+                for b, j in enumerate(channels):
+                    out[group, a, b] = self._chunk(i, j, k)[local]
+
+        return out
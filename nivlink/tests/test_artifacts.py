@@ -0,0 +1,82 @@
+import numpy as np
+from nivlink.artifacts import IntervalIndex
+
+def test_interval_index():
+
+    rng = np.random.RandomState(47404)
+    onsets = rng.randint(0, 1000, 300)
+    intervals = np.column_stack([onsets, onsets + rng.randint(1, 80, 300)])
+    windows = np.sort(rng.randint(0, 1000, (100, 2)), axis=1)
+    index = IntervalIndex(intervals)
+
+    ## Batched queries match all-pairs overlap.
+    overlap = np.logical_and(windows[:, :1] < intervals[:, 1], windows[:, 1:] > intervals[:, 0])
+    expected = np.where(overlap)
+    for a, b in zip(index.query_many(windows), expected): assert np.array_equal(a, b)
+
+    ## Single queries.
+    assert np.array_equal(index.query(*windows[3]), expected[1][expected[0] == 3])
+    assert index.query(2000, 3000).size == 0
+
+    ## Empty index.
+    assert IntervalIndex(np.empty(0)).query(0, 10).size == 0
+
+def test_raw_intervals(tmp_path):
+    from nivlink.tests.test_raw import make_raw
+
+    raw = make_raw(tmp_path)
+    index = raw.get_intervals('saccades')
+    assert raw.get_intervals('saccades') is index
+    assert np.array_equal(index.query(22, 52), [0, 1])
+
+    ## Index follows reassigned artifacts.
+    raw.saccades = raw.saccades[:1]
+    assert raw.get_intervals('saccades') is not index and len(raw.get_intervals('saccades')) == 1
+
+def test_interpolate_blinks(tmp_path):
+    from nivlink.artifacts import interpolate_blinks
+    from nivlink.tests.test_raw import make_raw
+
+    ## Linear: straight lines across gaps (edge gaps are held constant).
+    data = np.tile(np.arange(20.)[:, None, None], (1, 2, 2)) ** 2
+    data[5:8] = 1e8
+    blinks = np.array([[0, 2], [5, 7], [6, 8]])
+    expected = data.copy()
+    expected[5:8, :, 1] = np.linspace(16, 64, 5)[1:-1, None]
+    expected[:2, :, 1] = 4
+    interpolate_blinks(data, blinks)
+    assert np.allclose(data[:, :, 1], expected[:, :, 1])
+    assert np.all(data[5:8, :, 0] == 1e8)
+    ints = np.tile(np.arange(0, 200, 10, dtype=np.int16)[:, None, None], (1, 2, 2))
+    interpolate_blinks(ints, [[5, 8]])
+    assert ints.dtype == np.int16 and np.array_equal(ints[:, 0, 1], np.arange(0, 200, 10))
+
+    ## Integer data is rounded, and blocks inside a blink are left as is.
+    for method in ('linear', 'cubic'):
+        ints = np.zeros((6, 1, 1), dtype=np.int16)
+        ints[-1] = 2
+        interpolate_blinks(ints, [[1, 5]], method=method)
+        assert np.array_equal(ints[:, 0, 0], [0, 0, 1, 1, 2, 2])
+        ones = np.ones((10, 2, 3))
+        assert np.array_equal(interpolate_blinks(ones, [[0, 10]], method=method), np.ones((10, 2, 3)))
+
+    ## Cubic: Hermite spline reproduces smooth signals.
+    data = np.tile(np.sin(np.arange(100) / 10.)[:, None, None], (1, 2, 3))
+    clean = data.copy()
+    interpolate_blinks(data, [[40, 44]], method='cubic', channels=[2])
+    assert np.allclose(data[40:44, :, 2], clean[40:44, :, 2], atol=1e-2)
+
+    ## Blocks of a recording (blinks relative to recording).
+    block = clean[30:60].copy()
+    interpolate_blinks(block, [[40, 44]], method='cubic', channels=[2], offset=30)
+    assert np.array_equal(block[10:14], data[40:44])
+    block = np.asfortranarray(clean[30:60])
+    interpolate_blinks(block, [[40, 44]], method='cubic', channels=[2], offset=30)
+    assert np.allclose(block[10:14], data[40:44])
+
+    ## Raw method.
+    raw = make_raw(tmp_path)
+    copy = raw.copy().interpolate_blinks(pad=0.002)
+    assert np.array_equal(copy.data[:4], raw.data[:4]) and np.array_equal(copy.data[9:], raw.data[9:])
+    assert np.allclose(copy.data[6, :, 2], (raw.data[3, :, 2] + raw.data[9, :, 2]) / 2)
+    assert np.array_equal(copy.data[6, :, :2], raw.data[6, :, :2])
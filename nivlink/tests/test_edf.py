@@ -0,0 +1,285 @@
+import os, ctypes
+import numpy as np
+import pytest
+from nivlink.edf.edfread import _SampleBuffer, edf_sample_dtype, edf_format_samples
+from nivlink.edf.edfapi import FSAMPLE
+
+def test_sample_records():
+
+    ## Define samples.
+    samples = [FSAMPLE() for _ in range(3)]
+    for t, sample in enumerate(samples):
+        sample.time = 10 + t
+        sample.gx[:] = [1, 2]
+        sample.gy[:] = [3, 4]
+        sample.pa[:] = [5, 6]
+        sample.gxvel[:] = [7, 8]
+        sample.flags = 9
+
+    ## Record dtype mirrors FSAMPLE offsets.
+    dtype = edf_sample_dtype(('gx','gy','pupil'))
+    assert dtype.fields['gx'][1] == FSAMPLE.gx.offset
+    assert dtype.fields['pa'][1] == FSAMPLE.pa.offset
+    assert dtype.itemsize < ctypes.sizeof(FSAMPLE)
+
+    ## Copy samples (buffer must grow past its initial size).
+    buffer = _SampleBuffer(dtype, size=1)
+    for sample in samples: buffer.append(ctypes.pointer(sample))
+    records = buffer.finalize()
+    assert np.array_equal(records['time'], [10, 11, 12])
+
+    ## Default channels.
+    times, data, eye_names = edf_format_samples(records, ('gx','gy','pupil'), 'BOTH')
+    assert np.array_equal(times, [10, 11, 12])
+    assert data.shape == (3, 2, 3)
+    assert np.array_equal(data[0], [[1, 3, 5], [2, 4, 6]])
+
+    ## Extra channels. Channels shared across eyes are repeated.
+    dtype = edf_sample_dtype(('gxvel','flags'))
+    buffer = _SampleBuffer(dtype)
+    for sample in samples: buffer.append(ctypes.pointer(sample))
+    _, data, eye_names = edf_format_samples(buffer.finalize(), ('gxvel','flags'), 'RIGHT')
+    assert data.shape == (3, 1, 2)
+    assert np.array_equal(data[0], [[8, 9]])
+
+    ## Unknown channels.
+    with pytest.raises(ValueError):
+        edf_sample_dtype(('gx','foo'))
+
+ASC = '''** CONVERTED FROM sub01.edf using edfapi 3.1 Linux Jun 17 2013 on Wed Mar  8 09:25:20 2017
+** DATE: Wed Mar  8 09:25:20 2017
+** VERSION: EYELINK II 1
+** CAMERA: EyeLink USBCAM Version 1.01
+
+MSG\t1000 DISPLAY_COORDS 0 0 1023 767
+START\t1002 \tLEFT\tRIGHT\tSAMPLES\tEVENTS
+PRESCALER\t1
+PUPIL\tAREA
+SAMPLES\tGAZE\tLEFT\tRIGHT\tRATE\t 500.00\tTRACKING\tCR\tFILTER\t2
+1002\t 500.1\t 400.2\t 4000.0\t 501.1\t 401.2\t 4001.0\t.....
+1004\t 502.1\t 402.2\t 4002.0\t 503.1\t 403.2\t 4003.0\t.....
+MSG\t1005 TRIALID 1
+SBLINK R 1006
+1006\t   .\t   .\t    0.0\t 504.1\t 404.2\t 4004.0\tC....
+1008\t   .\t   .\t    0.0\t 505.1\t 405.2\t 4005.0\tC....
+EBLINK L 1006\t1008\t4
+SSACC R 1008
+1010\t 506.1\t 406.2\t 4006.0\t 507.1\t 407.2\t 4007.0\t.....
+ESACC R 1008\t1010\t4\t 505.1\t 405.2\t 507.1\t 407.2\t 0.50\t 100
+1012\t 508.1\t 408.2\t 4008.0\t 509.1\t 409.2\t 4009.0\t.....
+MSG\t1013 TRIAL_RESULT 0
+END\t1014 \tSAMPLES\tEVENTS\tRES\t 38.49\t 36.51
+'''
+
+def test_asc_read(tmp_path):
+    from nivlink.edf import asc_read
+
+    fname = tmp_path / 'sub01.asc'
+    fname.write_text(ASC)
+
+    ## Read in small chunks to exercise block parsing.
+    info, data, blinks, saccades, messages, ch_names, eye_names = asc_read(str(fname), chunksize=64)
+
+    assert info['sfreq'] == 500 and info['eye'] == 'BOTH' and info['pupil'] == 'AREA'
+    assert info['meas_date'].year == 2017
+    assert ch_names == ('gx','gy','pupil') and eye_names == ('LEFT','RIGHT')
+    assert data.shape == (6, 2, 3)
+    assert np.allclose(data[0], [[500.1, 400.2, 4000], [501.1, 401.2, 4001]])
+    assert np.all(data[2:4,0,:2] == 1e8)
+    assert np.array_equal(blinks, [[2, 3]])
+    assert np.array_equal(saccades, [[3, 4]])
+    assert np.array_equal(messages['sample'], [0, 2, 6])
+    assert messages['message'][1] == 'TRIALID 1'
+
+    ## Unsupported channels.
+    with pytest.raises(ValueError):
+        asc_read(str(fname), fields=('gx','gxvel'))
+
+    ## Files without SAMPLES lines.
+    fname.write_text(ASC.split('PRESCALER')[0])
+    with pytest.raises(ValueError, match='SAMPLES'):
+        asc_read(str(fname))
+
+ASC_LAYOUTS = '''** DATE: Wed Mar  8 09:25:20 2017
+START\t1000 \tLEFT\tSAMPLES\tEVENTS
+SAMPLES\tGAZE\tLEFT\tRATE\t 500.00\tTRACKING\tCR\tFILTER\t2
+1000\t 500.0\t 400.0\t 4000.0\t...
+1002\t 502.0\t 402.0\t 4002.0\t...
+END\t1004 \tSAMPLES\tEVENTS\tRES\t 38.49\t 36.51
+START\t1100 \tLEFT\tRIGHT\tSAMPLES\tEVENTS
+SAMPLES\tGAZE\tLEFT\tRIGHT\tVEL\tRATE\t 500.00\tTRACKING\tCR\tFILTER\t2
+1100\t 510.0\t 410.0\t 4010.0\t 610.0\t 510.0\t 5010.0\t 1.0\t 2.0\t 3.0\t 4.0\t.....
+MSG\t1101 TRIALID 2
+1102\t 512.0\t 412.0\t 4012.0\t 612.0\t 512.0\t 5012.0\t 1.0\t 2.0\t 3.0\t 4.0\t.....
+END\t1104 \tSAMPLES\tEVENTS\tRES\t 38.49\t 36.51
+'''
+
+def test_asc_read_layouts(tmp_path):
+    from nivlink.edf import asc_read
+
+    fname = tmp_path / 'sub01.asc'
+    fname.write_text(ASC_LAYOUTS)
+
+    ## Each recording is parsed with its own column layout.
+    for chunksize in [2**24, 64]:
+        info, data, _, _, messages, _, eye_names = asc_read(str(fname), chunksize=chunksize)
+        assert info['eye'] == 'BOTH' and eye_names == ('LEFT','RIGHT')
+        assert data.shape == (4, 2, 3)
+        assert np.array_equal(data[:2, 0], [[500, 400, 4000], [502, 402, 4002]])
+        assert np.all(data[:2, 1] == 1e8)
+        assert np.array_equal(data[3], [[512, 412, 4012], [612, 512, 5012]])
+        assert np.array_equal(messages['sample'], [3])
+
+class FakeEDF(object):
+    """Stand-in for the EDF API, replaying a list of (code, struct) items."""
+
+    def __init__(self, items, preamble=b'** DATE: Wed Mar  8 09:25:20 2017\n'):
+        self.items, self.preamble, self.i = items, preamble, -1
+
+    def install(self, monkeypatch):
+        from nivlink.edf import edfread
+        pointer = lambda *args: ctypes.pointer(self.items[self.i][1])
+        for name, func in dict(
+            edf_open_file = lambda *args: self,
+            edf_close_file = lambda *args: 0,
+            edf_get_element_count = lambda *args: len(self.items),
+            edf_get_preamble_text_length = lambda *args: len(self.preamble),
+            edf_get_preamble_text = lambda f, buf, n: ctypes.memmove(buf, self.preamble, n-1),
+            edf_get_next_data = self.next,
+            edf_get_sample_data = pointer,
+            edf_get_event_data = pointer,
+            edf_get_recording_data = pointer,
+        ).items(): monkeypatch.setattr(edfread, name, func)
+
+    def next(self, *args):
+        self.i += 1
+        return self.items[self.i][0] if self.i < len(self.items) else 0
+
+def make_fake_edf(n_samples=40, blinks=None):
+    """Simulate binocular recording at 500 Hz with blinks and messages."""
+    from nivlink.edf.edfapi import FEVENT, RECORDINGS, LSTRING
+
+    def message(time, text):
+        text = text.encode('UTF-8')
+        buf = ctypes.create_string_buffer(np.int16(len(text) + 1).tobytes() + text + b'\0')
+        event = FEVENT(sttime=time)
+        event.message = ctypes.cast(buf, ctypes.POINTER(LSTRING))
+        event._buf = buf
+        return (24, event)
+
+    items = [(30, RECORDINGS(state=1, sample_rate=500, eye=3, pupil_type=0)), message(998, 'START')]
+    if blinks is None: blinks = {1010: 1016, 1022: 1026, 1024: 1030, 1060: 1070}
+    for i in range(n_samples):
+        time = 1000 + 2 * i
+        sample = FSAMPLE(time=time)
+        sample.gx[:] = [i, -i]
+        sample.gy[:] = [2*i, -2*i]
+        sample.pa[:] = [4000 + i, 4000 - i]
+        items.append((200, sample))
+        for start, end in blinks.items():
+            if time == end + 4: items.append((4, FEVENT(sttime=start, entime=end)))
+        if i % 5 == 0: items.append(message(time + 1, 'TRIALID %s' %i))
+    items.append(message(1000 + 2 * n_samples, 'END'))
+    return FakeEDF(items)
+
+def test_iter_edf(tmp_path, monkeypatch):
+    from nivlink import Raw
+    from nivlink.edf import edf_read, iter_edf
+
+    fname = str(tmp_path / 'sub01.edf')
+    open(fname, 'w').close()
+
+    ## Read whole file.
+    make_fake_edf().install(monkeypatch)
+    info, data, blinks, saccades, messages, ch_names, eye_names = edf_read(fname)
+    assert info['sfreq'] == 500 and eye_names == ('LEFT','RIGHT')
+    assert data.shape == (40, 2, 3)
+    assert np.array_equal(data[3], [[3, 6, 4003], [-3, -6, 3997]])
+    assert np.array_equal(blinks, [[5, 8], [11, 13], [12, 15], [30, 35]])
+    assert messages['message'][0] == 'START' and messages['message'][-1] == 'END'
+
+    ## Read file in blocks.
+    make_fake_edf().install(monkeypatch)
+    chunks = list(iter_edf(fname, 7))
+    assert [start for start, *_ in chunks] == [0, 7, 14, 21, 28, 35]
+    assert np.array_equal(np.concatenate([chunk[1] for chunk in chunks]), data)
+    assert np.array_equal(np.concatenate([chunk[2] for chunk in chunks]), blinks)
+    assert np.array_equal(np.concatenate([chunk[4] for chunk in chunks]), messages)
+
+    ## Blocks match those of a loaded recording.
+    make_fake_edf().install(monkeypatch)
+    raw = Raw(fname)
+    for a, b in zip(chunks, raw.iter_chunks(7)):
+        assert a[0] == b[0]
+        for x, y in zip(a[1:], b[1:]): assert np.array_equal(x, y)
+
+def test_iter_edf_long_events(tmp_path, monkeypatch):
+    from nivlink import Raw
+    from nivlink.edf import edf_read, iter_edf
+    from nivlink.edf.edfread import _TimeIndex
+
+    fname = str(tmp_path / 'sub01.edf')
+    open(fname, 'w').close()
+    blinks = {1002: 1040, 1010: 1016, 1030: 1070}
+
+    ## Events spanning many blocks keep their onsets.
+    make_fake_edf(blinks=blinks).install(monkeypatch)
+    _, _, expected, _, messages, _, _ = edf_read(fname)
+    assert np.array_equal(expected, [[5, 8], [1, 20], [15, 35]])
+    make_fake_edf(blinks=blinks).install(monkeypatch)
+    raw = Raw(fname)
+    for n_samples in [1, 2, 3, 7]:
+        make_fake_edf(blinks=blinks).install(monkeypatch)
+        chunks = list(iter_edf(fname, n_samples))
+        assert np.array_equal(np.concatenate([chunk[2] for chunk in chunks]), expected)
+        assert np.array_equal(np.concatenate([chunk[4] for chunk in chunks]), messages)
+
+        ## Per block, events are never assigned before the block they end in, and
+        ## match a loaded recording once blocks are longer than the reporting lag
+        ## (2 samples, in the fake EDF).
+        loaded = list(raw.iter_chunks(n_samples))
+        assert [chunk[0] for chunk in chunks] == [chunk[0] for chunk in loaded]
+        for i in (2, 4):
+            block = lambda chunks: np.repeat(np.arange(len(chunks)), [len(chunk[i]) for chunk in chunks])
+            assert np.all(block(chunks) >= block(loaded))
+            if n_samples > 2: assert np.array_equal(block(chunks), block(loaded))
+
+    ## Time index matches search of all sample times (with gaps between recordings).
+    times = np.concatenate([np.arange(1000, 1020, 2), [1021, 1022], np.arange(1100, 1200, 4)])
+    index = _TimeIndex()
+    for block in np.array_split(times, 5): index.extend(block)
+    queries = np.arange(990, 1210)
+    assert np.array_equal(index.searchsorted(queries), np.searchsorted(times, queries))
+
+def test_edf_cache(tmp_path, monkeypatch):
+    from nivlink import Raw
+    from nivlink.edf import edfread
+    from nivlink.edf.cache import EDFCache, file_key
+
+    fname = str(tmp_path / 'sub01.edf')
+    open(fname, 'w').close()
+    cache = EDFCache(str(tmp_path / 'cache'))
+
+    ## First read parses file.
+    make_fake_edf().install(monkeypatch)
+    raw = Raw(fname, cache_dir=cache)
+    assert len(os.listdir(cache.cache_dir)) == 2    # Entry and lock file.
+
+    ## Later reads do not.
+    monkeypatch.setattr(edfread, 'edf_open_file', None)
+    copy = Raw(fname, cache_dir=cache)
+    assert isinstance(copy.data, np.memmap)
+    assert copy.info == raw.info and copy.eye_names == raw.eye_names
+    for attr in ('data', 'blinks', 'saccades', 'messages'):
+        assert np.array_equal(getattr(copy, attr), getattr(raw, attr))
+
+    ## Key depends on fields and file contents.
+    assert file_key(fname) != file_key(fname, ('gx',))
+    assert file_key(fname, content_hash=True) != file_key(fname)
+
+    ## Least recently used entries are evicted.
+    make_fake_edf().install(monkeypatch)
+    cache.max_size = 1
+    Raw(fname, fields=('gx',), cache_dir=cache)
+    entries = [f for f in os.listdir(cache.cache_dir) if not f.startswith('.')]
+    assert entries == [file_key(fname, ('gx',))]
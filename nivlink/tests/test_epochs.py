@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+from nivlink import Epochs
+from nivlink.tests.test_raw import make_raw
+
+def test_epochs(tmp_path):
+
+    raw = make_raw(tmp_path, n_times=1000)
+    events = np.array([100, 300, 500, 990])
+    tmin, tmax = np.array([-0.1, 0, -0.05, 0]), np.array([0.1, 0.2, 0.1, 0.2])
+
+    epochs = Epochs(raw, events, tmin=tmin, tmax=tmax, picks=['gx', 'pupil'], eyes='RIGHT')
+    assert epochs.data.shape == (4, 1, 2, epochs.times.size)
+    assert epochs.ch_names == ('gx', 'pupil') and epochs.eye_names == ('RIGHT',)
+
+    ## Epochs match raw data, padded with NaNs.
+    for i, (onset, t1, t2) in enumerate(zip(events, tmin, tmax)):
+        e1 = int(round((t1 - tmin.min()) * 500))
+        r1, r2 = onset + int(round(t1 * 500)), onset + int(round(t2 * 500))
+        expected = raw.data[r1:min(r2, raw.n_samp), 1][:, [0, 2]].T
+        assert np.array_equal(epochs.data[i, 0, :, e1:e1+expected.shape[-1]], expected)
+        assert np.isnan(epochs.data[i, 0, :, :e1]).all()
+        assert np.isnan(epochs.data[i, 0, :, e1+expected.shape[-1]:]).all()
+
+def test_epochs_lazy(tmp_path):
+
+    raw = make_raw(tmp_path, n_times=1000)
+    events = np.arange(50, 950, 10)
+    epochs = Epochs(raw, events, tmin=-0.1, tmax=0.1)
+    lazy = Epochs(raw, events, tmin=-0.1, tmax=0.1, preload=False)
+    assert not lazy.preload and lazy._data is None and len(lazy) == events.size
+    assert repr(lazy) == repr(epochs)
+
+    ## Epochs are extracted on demand.
+    assert np.array_equal(lazy.data, epochs.data)
+    assert np.array_equal(lazy.get_data([3, 1], 'pupil'), epochs.data[[3, 1]][:, :, [2]])
+    assert np.array_equal(lazy.get_data(slice(2, 4)), epochs.get_data(slice(2, 4)))
+    for i, epoch in enumerate(lazy): assert np.array_equal(epoch, epochs.data[i])
+    assert np.array_equal(lazy.blinks, epochs.blinks)
+
+def test_align_artifacts(tmp_path):
+
+    raw = make_raw(tmp_path, n_times=1000)
+    rng = np.random.RandomState(47404)
+    onsets = np.sort(rng.randint(0, 990, 200))
+    raw.saccades = np.column_stack([onsets, onsets + rng.randint(1, 60, 200)])
+    events = np.sort(rng.randint(0, 1000, 50))
+    epochs = Epochs(raw, events, tmin=-0.05, tmax=0.1, blinks=False)
+
+    ## Reference: overlap of all pairs of trials and artifacts (clipped to 75-sample trials).
+    raw_ix = events[:, None] + [-25, 50]
+    trials, ix = np.where(np.logical_and(raw_ix[:, :1] < raw.saccades[:, 1],
+                                         raw_ix[:, 1:] > raw.saccades[:, 0]))
+    expected = np.column_stack([trials, np.clip(raw.saccades[ix] - raw_ix[trials, :1], 0, 75)])
+    assert np.array_equal(epochs.saccades, expected)
+
+    ## Variable-length epochs: artifacts are offset by each trial's onset in
+    ## the epochs, and clipped to the trial.
+    raw.saccades = np.array([[85, 95], [105, 120], [290, 297], [303, 330]])
+    epochs = Epochs(raw, np.array([100, 300]), tmin=np.array([-0.02, -0.01]), 
+                    tmax=np.array([0.02, 0.01]), blinks=False)
+    assert np.array_equal(epochs.saccades, [[0, 0, 5], [0, 15, 20], [1, 5, 7], [1, 13, 15]])
+
+def test_mask_artifacts(tmp_path):
+
+    raw = make_raw(tmp_path, n_times=1000)
+    raw.blinks = np.array([[90, 110], [395, 405], [600, 700]])
+    raw.saccades = np.array([[520, 525]])
+    events = np.array([100, 300, 400, 520, 650])
+    epochs = Epochs(raw, events, tmin=-0.02, tmax=0.04)     # 30 samples
+
+    ## Artifacts are masked in all eyes and channels.
+    epochs.mask_artifacts('blinks', pad=0.004)
+    data = epochs.data
+    assert np.isnan(data[0, ..., :22]).all() and not np.isnan(data[0, ..., 22:]).any()
+    assert np.isnan(data[4]).all()
+    assert not np.isnan(data[1]).any() and not np.isnan(data[3]).any()
+    mask = np.isnan(data[2, 0, 0])
+    assert np.array_equal(np.flatnonzero(mask), np.arange(3, 17))
+    assert np.array_equal(data[2, :, :, ~mask], Epochs(raw, events, tmin=-0.02, tmax=0.04).data[2, :, :, ~mask])
+
+    ## Bad trials are dropped; artifacts are renumbered.
+    epochs.drop_bad(threshold=0.2)
+    assert len(epochs) == 2 and epochs.data.shape[0] == 2
+    assert np.array_equal(epochs.saccades[:, 0], [1])
+    assert epochs.blinks.shape[0] == 0
+
+    ## Lazy epochs can drop (but not mask) trials.
+    lazy = Epochs(raw, events, tmin=-0.02, tmax=0.04, preload=False).drop_bad(0.2)
+    assert np.array_equal(lazy.data, epochs.data)
+    with pytest.raises(ValueError):
+        lazy.mask_artifacts()
+
+    ## Variable-length epochs are masked within each trial.
+    raw.blinks = np.array([[95, 100], [298, 302]])
+    variable = Epochs(raw, np.array([100, 300]), tmin=np.array([-0.02, -0.01]), tmax=0.02)
+    variable.mask_artifacts('blinks')
+    assert np.array_equal(np.flatnonzero(np.isnan(variable.data[0, 0, 0])), np.arange(5, 10))
+    assert np.array_equal(np.flatnonzero(np.isnan(variable.data[1, 0, 0])), np.r_[0:5, 8:12])
+
+def test_apply_baseline(tmp_path):
+
+    raw = make_raw(tmp_path, n_times=1000)
+    events = np.array([100, 300, 500])
+    epochs = Epochs(raw, events, tmin=-0.02, tmax=0.04)
+    epochs.data[0, 0, 0, 2] = np.nan
+    ix = epochs.times <= 0
+    for mode in ('mean', 'percent', 'zscore'):
+        data = epochs.data.copy()
+        mean = np.nanmean(data[..., ix], axis=-1, keepdims=True)
+        expected = dict(mean=data - mean, percent=(data - mean) / mean * 100,
+                        zscore=(data - mean) / np.nanstd(data[..., ix], axis=-1, keepdims=True))[mode]
+        corrected = epochs.copy().apply_baseline((None, 0), mode=mode, chunk_size=2)
+        assert np.allclose(corrected.data, expected, equal_nan=True)
+    with pytest.raises(ValueError):
+        epochs.apply_baseline((1, 2))
@@ -0,0 +1,24 @@
+import sys, subprocess
+
+## Modules that must not be loaded by `import nivlink`.
+deferred = ('nivlink.edf.edfapi', 'urllib.request', 'pandas', 'scipy', 'matplotlib')
+
+def test_import():
+
+    ## Import NivLink in a fresh interpreter.
+    code = 'import sys, nivlink; print(",".join(sys.modules))'
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                         capture_output=True, text=True, check=True)
+
+    ## Heavy dependencies and the EDF library are loaded on first use.
+    modules = out.stdout.strip().split(',')
+    for module in deferred: assert module not in modules
+
+    ## Import time of NivLink itself (excluding NumPy), in microseconds.
+    cumulative = dict()
+    for line in out.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line: continue
+        _, total, name = line.split('|')
+        cumulative[name.strip()] = int(total)
+    elapsed = cumulative['nivlink'] - cumulative.get('numpy', 0)
+    assert elapsed < 5e5
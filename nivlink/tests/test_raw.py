@@ -0,0 +1,210 @@
+import os
+import numpy as np
+import pytest
+from datetime import datetime
+from nivlink import Raw
+
+def make_raw(tmp_path, n_times=100, eye_names=('LEFT','RIGHT')):
+    """Simulate recording and save to NumPy compressed format."""
+    rng = np.random.RandomState(47404)
+    info = dict(sfreq=500, eye='BOTH', meas_date=datetime(2017, 3, 8, 9, 25, 20))
+    data = rng.uniform(0, 1000, (n_times, len(eye_names), 3))
+    messages = np.array([(i, 'TRIALID %s' %i) for i in range(0, n_times, 10)],
+                        dtype=[('sample',int),('message',np.unicode_,80)])
+    fname = str(tmp_path / 'raw.npz')
+    np.savez_compressed(fname, info=info, data=data, blinks=np.array([[5, 8]]),
+                        saccades=np.array([[20, 24], [50, 55]]), messages=messages,
+                        ch_names=('gx','gy','pupil'), eye_names=eye_names)
+    return Raw(fname)
+
+def test_save_uncompressed(tmp_path):
+
+    raw = make_raw(tmp_path)
+    fname = str(tmp_path / 'raw')
+    raw.save(fname, compress=False)
+    assert sorted(os.listdir(fname)) == ['blinks.npy', 'data.npy', 'info.json',
+                                         'messages.npy', 'saccades.npy']
+
+    ## Data are memory-mapped (read-only by default).
+    copy = Raw(fname)
+    assert isinstance(copy.data, np.memmap) and not copy.data.flags.writeable
+    assert copy.info == raw.info
+    assert copy.ch_names == raw.ch_names and copy.eye_names == raw.eye_names
+    for attr in ('data', 'blinks', 'saccades', 'messages'):
+        assert np.array_equal(getattr(copy, attr), getattr(raw, attr))
+
+    ## Copy-on-write and in-memory modes.
+    copy = Raw(fname, mmap_mode='c')
+    copy.data[0] = -1
+    assert np.array_equal(Raw(fname, mmap_mode=None).data, raw.data)
+
+    ## Overwriting.
+    with pytest.raises(IOError):
+        raw.save(fname, compress=False)
+    raw.save(fname, compress=False, overwrite=True)
+    assert [f for f in os.listdir(fname) if f.endswith('.tmp')] == []
+
+def test_save_monocular(tmp_path):
+
+    raw = make_raw(tmp_path, eye_names=('LEFT',))
+    fname = str(tmp_path / 'raw')
+    raw.save(fname, compress=False)
+    assert Raw(fname).eye_names == ('LEFT',)
+
+def test_chunked_store(tmp_path):
+    from nivlink import Epochs
+    from nivlink.store import ChunkedArray, save_chunked
+
+    ## Codecs round-trip exactly.
+    raw = make_raw(tmp_path)
+    for codec in ('none', 'zlib', 'shuffle', dict(pupil='zlib')):
+        path = str(tmp_path / 'store')
+        save_chunked(path, raw.data, raw.ch_names, chunks=16, codec=codec)
+        arr = ChunkedArray(path)
+        assert arr.shape == raw.data.shape and arr.dtype == raw.data.dtype
+        assert np.array_equal(np.asarray(arr), raw.data)
+
+    ## Indexing matches NumPy (orthogonally across axes).
+    assert np.array_equal(arr[10:40:3], raw.data[10:40:3])
+    assert np.array_equal(arr[-5], raw.data[-5])
+    assert np.array_equal(arr[15:17, 1], raw.data[15:17, 1])
+    assert np.array_equal(arr.oindex[[90, 3, 40], [True, False], [0, 2]],
+                          raw.data[[90, 3, 40]][:, [0]][..., [0, 2]])
+    with pytest.raises(IndexError):
+        arr[100]
+
+    ## Raw saves and opens chunked data.
+    fname = str(tmp_path / 'raw')
+    raw.save(fname, chunks=32)
+    copy = Raw(fname)
+    assert isinstance(copy.data, ChunkedArray) and copy.n_samp == raw.n_samp
+
+    ## Epochs read only what they need.
+    events = np.array([20, 50, 70])
+    a = Epochs(raw, events, tmin=-0.01, tmax=0.02, picks='pupil', eyes='RIGHT')
+    b = Epochs(copy, events, tmin=-0.01, tmax=0.02, picks='pupil', eyes='RIGHT')
+    assert np.array_equal(a.data, b.data)
+
+    ## Overwrite with uncompressed format.
+    copy.save(fname, compress=False, overwrite=True)
+    assert not os.path.isdir(os.path.join(fname, 'data'))
+    assert np.array_equal(Raw(fname).data, raw.data)
+
+def test_read_raws(tmp_path):
+    from nivlink import read_raws
+
+    raw = make_raw(tmp_path)
+    fnames = [str(tmp_path / 'raw.npz'), str(tmp_path / 'missing.npz'), str(tmp_path / 'raw.npz')]
+
+    ## Failures are reported per file.
+    with pytest.raises(IOError, match='missing.npz'):
+        read_raws(fnames, n_jobs=2)
+    for n_jobs in (1, 2):
+        with pytest.warns(UserWarning, match='missing.npz'):
+            raws = read_raws(fnames, n_jobs=n_jobs, errors='warn')
+        assert raws[1] is None
+        for copy in (raws[0], raws[2]):
+            assert np.array_equal(copy.data, raw.data) and copy.info == raw.info
+            assert np.array_equal(copy.messages, raw.messages)
+
+        ## Data can be modified in place, whatever the number of jobs.
+        raws[0].data[0] = 0
+        raws[0].interpolate_blinks()
+        assert np.all(raws[0].data[0] == 0) and np.array_equal(raws[2].data, raw.data)
+
+def test_find_events(tmp_path):
+
+    raw = make_raw(tmp_path)
+    raw.messages = np.array([(0, 'START'), (5, 'TRIALID 1'), (9, 'STIM a.png'), 
+                             (15, 'TRIALID 2'), (19, 'STIM b.png'), (30, 'TRIALID 12')],
+                            dtype=raw.messages.dtype)
+
+    ## Literal and regex patterns.
+    assert np.array_equal(raw.find_events('TRIALID'), [5, 15, 30])
+    assert np.array_equal(raw.find_events('TRIALID 1'), [5, 30])
+    assert np.array_equal(raw.find_events(r'TRIALID 1$'), [5])
+    assert np.array_equal(raw.find_events('.png'), [9, 19])
+    assert raw.find_events('missing').size == 0
+    onsets, messages = raw.find_events('STIM', return_messages=True)
+    assert list(messages) == ['STIM a.png', 'STIM b.png']
+
+    ## Batched patterns.
+    a, b, c = raw.find_events(['TRIALID', r'\d$', 'START'])
+    assert np.array_equal(a, [5, 15, 30]) and np.array_equal(b, [5, 15, 30])
+    assert np.array_equal(c, [0])
+
+    ## Compiled patterns (cached by source and flags).
+    import re
+    assert np.array_equal(raw.find_events(re.compile('TRIALID')), [5, 15, 30])
+    assert raw.find_events(re.compile('trialid')).size == 0
+    assert np.array_equal(raw.find_events(re.compile('trialid', re.I)), [5, 15, 30])
+    a, b = raw.find_events([re.compile(r'1$'), 'START'])
+    assert np.array_equal(a, [5]) and np.array_equal(b, [0])
+
+    ## Index follows reassigned messages.
+    raw.messages = raw.messages[:2]
+    assert np.array_equal(raw.find_events('TRIALID'), [5])
+
+def test_events_table(tmp_path):
+
+    raw = make_raw(tmp_path)
+    raw.messages = np.array([(0, 'START'), (5, 'TRIALID 1 COND easy'), (15, 'TRIALID 2 COND hard'),
+                             (30, 'TRIALID 3 COND ' + 'x' * 100)], dtype=[('sample',int),('message',object)])
+
+    events = raw.events_table(r'TRIALID (?P<trial>\d+) COND (?P<cond>\w+)')
+    assert list(events.columns) == ['sample', 'message', 'trial', 'cond']
+    assert list(events['sample']) == [5, 15, 30] and list(events['trial']) == [1, 2, 3]
+    assert events['trial'].dtype.kind == 'i'
+    assert events['cond'][2] == 'x' * 100    # Long messages are not truncated.
+
+    ## Tables are cached, but returned as copies.
+    events['trial'] = 0
+    assert list(raw.events_table(r'TRIALID (?P<trial>\d+) COND (?P<cond>\w+)')['trial']) == [1, 2, 3]
+    assert len(raw.events_table()) == 4 and len(raw.events_table('START')) == 1
+
+def test_dtype(tmp_path):
+    from nivlink import Epochs
+    from nivlink.edf.utils import convert_samples, missing_value
+
+    raw = make_raw(tmp_path)
+    raw.data[10, 0, 0] = 1e8
+    raw.data[11, 0, 0] = np.nan
+    raw.data[12, 0, 2] = 4e5
+    raw.save(str(tmp_path / 'raw.npz'), overwrite=True)
+
+    ## Float samples are cast; missing values are kept.
+    data = Raw(str(tmp_path / 'raw.npz'), dtype='float32').data
+    assert data.dtype == np.float32 and data[10, 0, 0] == 1e8
+    assert np.allclose(data[:10], raw.data[:10])
+
+    ## Integer samples are rounded; missing values are marked.
+    data = Raw(str(tmp_path / 'raw.npz'), dtype='int16').data
+    assert data.dtype == np.int16 and missing_value(data.dtype) == -32768
+    assert np.array_equal(data[:10], np.rint(raw.data[:10]))
+    assert data[10, 0, 0] == data[11, 0, 0] == data[12, 0, 2] == -32768
+    assert np.all(convert_samples(data, 'int32')[10:13][data[10:13] == -32768] == np.iinfo(np.int32).min)
+    assert convert_samples(data, 'float64')[10, 0, 0] == 1e8
+    with pytest.raises(ValueError):
+        convert_samples(raw.data, 'uint8')
+
+    ## Saving keeps compact types.
+    raw.save(str(tmp_path / 'raw16.npz'), dtype='int16')
+    assert Raw(str(tmp_path / 'raw16.npz')).data.dtype == np.int16
+
+    ## Epochs keep (or convert) types; padding is NaN or the integer minimum.
+    raw16 = Raw(str(tmp_path / 'raw16.npz'))
+    epochs = Epochs(raw16, np.array([20, 95]), tmin=0, tmax=0.02)
+    assert epochs.data.dtype == np.int16 and epochs.data[1, 0, 0, -1] == -32768
+    epochs = Epochs(raw, np.array([20, 95]), tmin=0, tmax=0.02, dtype='float32')
+    assert epochs.data.dtype == np.float32 and np.isnan(epochs.data[1, 0, 0, -1])
+
+    ## Epochs are converted blockwise, as they are gathered.
+    from nivlink.epochs import _gather_epochs
+    raw_ix = np.array([[5, 15], [50, 60], [90, 100], [-3, 7]])
+    epoch_ix = np.tile([0, 10], (4, 1))
+    eye_ix, ch_ix = np.arange(2), np.arange(3)
+    expected = convert_samples(_gather_epochs(raw.data, raw_ix, epoch_ix, 10, eye_ix, ch_ix), 'int16')
+    expected[3, ..., :3] = -32768
+    for block_size in [2**22, 60]:
+        epochs = _gather_epochs(raw.data, raw_ix, epoch_ix, 10, eye_ix, ch_ix, 'int16', block_size)
+        assert epochs.dtype == np.int16 and np.array_equal(epochs, expected)
@@ -1,5 +1,7 @@
 import numpy as np
-from nivlink import Screen
+import pytest
+from nivlink import Screen, Epochs, align_to_aoi
+from nivlink.tests.test_raw import make_raw
 
 '''
 NOTE: We do not test any epoching functions. This would require storing
@@ -31,4 +33,162 @@ def test_workflow():
 
     assert np.all(info.indices[:xdim//2] == 1)    # Test screen indices update.
     assert np.all(info.indices[xdim//2:] == 2)    # Test screen indices update.
-    assert np.all(np.equal(info.labels, [1,2]))   # Test screen indices update.
\ No newline at end of file
+    assert np.all(np.equal(info.labels, [1,2]))   # Test screen indices update.
+
+def test_indices_dtype():
+
+    ## Look-up table is stored in smallest unsigned integer type.
+    info = Screen(20, 20, n_screens=2)
+    assert info.indices.dtype == np.uint8
+    for i in range(300):
+        info.add_rectangle_aoi(i % 20, i % 20 + 1, i // 20, i // 20 + 1, screen_id=1)
+    assert info.indices.dtype == np.uint16 and info.labels == tuple(range(1, 301))
+    assert info.indices[19, 14, 0] == 300 and info.indices[0, 15, 0] == 0
+
+    ## Overwritten AoIs are relabeled, and the type narrowed again.
+    info.add_rectangle_aoi(0, 20, 0, 20, screen_id=1)
+    assert info.indices.dtype == np.uint8 and info.labels == (1,)
+    assert np.all(info.indices[..., 0] == 1) and np.all(info.indices[..., 1] == 0)
+
+def test_finalize():
+
+    ## AoIs are labeled incrementally, and compacted on first access.
+    info = Screen(100, 100, n_screens=2)
+    info.add_rectangle_aoi(0, 50, 0, 100, screen_id=1)
+    info.add_rectangle_aoi(0, 100, 0, 100, screen_id=1)
+    info.add_ellipsoid_aoi(50, 50, 20, 10, screen_id=2)
+    info.add_rectangle_aoi(10, 10, 0, 100, screen_id=2)
+    assert not info._finalized and info._indices.max() == 3
+    assert info.labels == (1, 2) and info._finalized
+    assert np.all(info.indices[..., 0] == 1) and info.indices[50, 50, 1] == 2
+
+    ## Labels match compaction after every AoI.
+    eager = Screen(100, 100, n_screens=2)
+    for args, screen_id in [((0, 50, 0, 100), 1), ((0, 100, 0, 100), 1)]:
+        eager.add_rectangle_aoi(*args, screen_id=screen_id)
+        eager.finalize()
+    eager.add_ellipsoid_aoi(50, 50, 20, 10, screen_id=2)
+    assert np.array_equal(eager.indices, info.indices)
+
+def test_vector_backend():
+
+    ## Define the same AoIs with both backends.
+    screens = [Screen(120, 90, n_screens=2), Screen(120, 90, n_screens=2, backend='vector')]
+    for info in screens:
+        info.add_rectangle_aoi(0.1, 0.5, 10, 200, screen_id=1)
+        info.add_ellipsoid_aoi(60.5, 45.2, 30, 12.3, rotation=np.radians(135), screen_id=1,
+                               halfplanes=[(1.0, -15.2, 1)])
+        info.add_rectangle_aoi(50, 60, 40, 50, screen_id=1)
+        info.add_rectangle_aoi(40, 70, 30, 60, screen_id=1)     # Covers previous AoI.
+        info.add_ellipsoid_aoi(300, 45, 10, 10, screen_id=2)   # Off screen.
+        info.add_ellipsoid_aoi(110, 80, 25, 40, rotation=0.3, screen_id=2)
+        info.add_rectangle_aoi(-20, -5, 0, 30, screen_id=2)
+    raster, vector = screens
+    assert vector._indices is None
+    assert vector.labels == raster.labels == (1, 2, 3, 4, 5)
+    assert np.array_equal(vector.indices, raster.indices)
+    assert vector.indices is vector.indices    # Rasterized once.
+
+    ## Gaze positions are classified alike.
+    rng = np.random.RandomState(47404)
+    data = rng.uniform(-10, 130, (20, 2, 2, 50))
+    mapping = rng.randint(0, 2, 20)
+    aligned = align_to_aoi(data, vector, mapping, block_size=100)
+    assert np.array_equal(aligned, align_to_aoi(data, raster, mapping))
+    assert aligned.dtype == raster.indices.dtype
+
+    ## Rasterized look-up table is updated when AoIs are added.
+    vector.add_rectangle_aoi(0, 5, 0, 5)
+    assert vector.indices[0, 0, 0] == 6
+
+    with pytest.raises(ValueError):
+        vector.add_ellipsoid_aoi(60, 45, 10, 10, mask=np.ones((120, 90)))
+
+def reference_polygon(vertices, xdim, ydim):
+    """Test every pixel of screen against polygon (PNPOLY)."""
+    inside = np.zeros((xdim, ydim), dtype=bool)
+    for (xi, yi), (xj, yj) in zip(vertices, np.roll(vertices, -1, axis=0)):
+        for x, y in np.ndindex(xdim, ydim):
+            if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+                inside[x, y] = not inside[x, y]
+    return inside
+
+def test_polygon_mask_aoi():
+
+    ## Polygons match brute-force even-odd test (non-convex, self-intersecting,
+    ## partly off screen).
+    xdim, ydim = 60, 40
+    polygons = [np.array([[5, 5], [30.5, 2.2], [20, 15], [35, 35.7], [2.5, 30]]),
+                np.array([[30, 0], [55, 35], [10, 12], [62, 12], [25, 35]]),
+                np.array([[-10, 20], [70, 20], [70, 45], [-10, 45]])]
+    for vertices in polygons:
+        info = Screen(xdim, ydim)
+        info.add_polygon_aoi(vertices)
+        assert np.array_equal(info.indices[..., 0] == 1, reference_polygon(vertices, xdim, ydim))
+
+    ## Polygons with integer corners match rectangles.
+    rect, poly = Screen(xdim, ydim), Screen(xdim, ydim)
+    rect.add_rectangle_aoi(10, 20, 5, 15)
+    poly.add_polygon_aoi([[10, 5], [20, 5], [20, 15], [10, 15]])
+    assert np.array_equal(rect.indices, poly.indices)
+
+    ## Backends agree, with later AoIs overwriting earlier ones.
+    mask = np.zeros((xdim, ydim), dtype=bool)
+    mask[::3, 10:30] = True
+    screens = [Screen(xdim, ydim, 2), Screen(xdim, ydim, 2, backend='vector')]
+    for info in screens:
+        for i, vertices in enumerate(polygons): info.add_polygon_aoi(vertices, screen_id=i % 2 + 1)
+        info.add_mask_aoi(mask, screen_id=2)
+        info.add_mask_aoi(np.zeros_like(mask), screen_id=1)
+    raster, vector = screens
+    assert raster.labels == vector.labels == (1, 2, 3, 4)
+    assert np.all(raster.indices[mask, 1] == 4)
+    assert np.array_equal(raster.indices, vector.indices)
+
+    with pytest.raises(ValueError):
+        raster.add_mask_aoi(np.ones((ydim, xdim)))
+    with pytest.raises(ValueError):
+        raster.add_polygon_aoi([[0, 0], [10, 10]])
+
+def reference_align(data, screen, mapping):
+    """Align gaze data (n_trials, n_eyes, 2, n_times) one sample at a time."""
+    n_trials, n_eyes, _, n_times = data.shape
+    aligned = np.zeros((n_trials, n_eyes, n_times), dtype=int)
+    for i, j, k in np.ndindex(*aligned.shape):
+        x, y = data[i, j, :, k]
+        if 0 <= x < screen.xdim and 0 <= y < screen.ydim:
+            aligned[i, j, k] = screen.indices[int(x), int(y), mapping[i]]
+    return aligned
+
+def test_align_to_aoi(tmp_path):
+
+    ## Define screens.
+    info = Screen(500, 400, n_screens=2)
+    info.add_rectangle_aoi(0, 250, 0, 400, screen_id=1)
+    info.add_ellipsoid_aoi(250, 200, 100, 50, screen_id=2)
+
+    ## Simulate gaze data, partly off screen or missing.
+    rng = np.random.RandomState(47404)
+    data = rng.uniform(-50, 550, (6, 2, 2, 40))
+    data[0, 0, 0, :5] = np.nan
+    mapping = np.array([0, 1, 1, 0, 1, 0])
+    expected = reference_align(data, info, mapping)
+    for block_size in [2**20, 7]:
+        aligned = align_to_aoi(data, info, mapping, block_size=block_size)
+        assert np.array_equal(aligned, expected)
+    assert aligned.dtype == info.indices.dtype == np.uint8
+
+    ## Raw data are aligned as a single trial.
+    raw = make_raw(tmp_path, n_times=1000)
+    aligned = align_to_aoi(raw, info, block_size=100)
+    assert aligned.shape == (1, 2, 1000)
+    assert np.array_equal(aligned, reference_align(raw.data[..., :2].T.swapaxes(0, 1)[np.newaxis], info, [0]))
+
+    ## Preloaded and lazy epochs are aligned alike.
+    events = np.arange(50, 950, 100)
+    epochs = Epochs(raw, events, tmin=-0.1, tmax=0.1)
+    lazy = Epochs(raw, events, tmin=-0.1, tmax=0.1, preload=False)
+    mapping = np.arange(events.size) % 2
+    expected = reference_align(epochs.data[:, :, :2], info, mapping)
+    assert np.array_equal(align_to_aoi(epochs, info, mapping), expected)
+    assert np.array_equal(align_to_aoi(lazy, info, mapping, block_size=50), expected)
@@ -1,8 +1,12 @@
 import os
 import numpy as np
 
-def plot_raw_blinks(fname, raw, overwrite=True, show=False):
-    """Plot detected (and corrected) blinks in raw pupillometry data."""
+def plot_raw_blinks(fname, raw, overwrite=True, show=False, window=None):
+    """Plot detected (and corrected) blinks in raw pupillometry data.
+    
+    If `window` (start, stop) is given (in samples), only blinks overlapping
+    the window are plotted.
+    """
     from bokeh.plotting import figure, output_file, show
     from bokeh.models import BoxZoomTool, Range1d
     
@@ -28,7 +32,9 @@ def plot_raw_blinks(fname, raw, overwrite=True, show=False):
     
     ## Plot blink periods.
     X, Y = [], []
-    for i, j in raw.blinks:
+    index = raw.get_intervals('blinks')
+    ix = np.arange(len(index)) if window is None else index.query(*window)
+    for i, j in index.intervals[ix]:
         X.append(raw.times[i:j])
         Y.append(raw.data[i:j,-1])
         plot.patch(np.hstack((X[-1],X[-1][::-1])), 